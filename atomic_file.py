@@ -0,0 +1,9 @@
+import json
+import os
+
+def write_json_atomic(path, data, default=None, indent=None):
+    """Write JSON to a temporary file and move it into place, so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, default=default, indent=indent)
+    os.replace(tmp_path, path)
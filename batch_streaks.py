@@ -0,0 +1,158 @@
+import json
+import time
+
+import numpy as np
+
+from load_from_files import load_match_archive, process_match
+from match_store import day_to_date
+from streak_engine import MAX_HISTORY_DEPTH, TeamState, new_history
+from team_registry import load_registry
+
+def last_position(flags, positions, starts):
+    """Return, for every row, the latest position in its team group where flags is set (or start - 1)"""
+    marked = np.where(flags, positions, -1)
+    return np.maximum(np.maximum.accumulate(marked), starts - 1)
+
+def compute_streaks(days, home_ids, away_ids, home_goals, away_goals, names, event_ids=None):
+    """Compute the final team statistics for a full match history in one batch
+
+    Rows must be in chronological order. The result matches replaying every
+    row through streak_engine.apply_match, including its duplicate filtering
+    (by event id, or by (home, away, score) for rows without one), team
+    insertion order, match_history and last_streak_match.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    home_ids = np.asarray(home_ids, dtype=np.int64)
+    away_ids = np.asarray(away_ids, dtype=np.int64)
+    home_goals = np.asarray(home_goals, dtype=np.int64)
+    away_goals = np.asarray(away_goals, dtype=np.int64)
+    event_ids = np.zeros(len(days), dtype=np.uint64) if event_ids is None else np.asarray(event_ids, dtype=np.uint64)
+    if not len(days):
+        return {}
+
+    # Keep only the first occurrence of each event id, and of each
+    # (home, away, home score, away score) among rows without an event id
+    with_id = np.flatnonzero(event_ids != 0)
+    without_id = np.flatnonzero(event_ids == 0)
+    _, first_with_id = np.unique(event_ids[with_id], return_index=True)
+    keys = np.stack([home_ids, away_ids, home_goals, away_goals], axis=1)[without_id]
+    _, first_without_id = np.unique(keys, axis=0, return_index=True)
+    rows = np.sort(np.concatenate([with_id[first_with_id], without_id[first_without_id]]))
+    count = len(rows)
+
+    # Explode every match into one entry per team; the interleaved order
+    # (home then away for each row) is the order teams are first seen
+    team = np.empty(count * 2, dtype=np.int64)
+    team[0::2], team[1::2] = home_ids[rows], away_ids[rows]
+    opponent = np.empty_like(team)
+    opponent[0::2], opponent[1::2] = away_ids[rows], home_ids[rows]
+    goals_for = np.empty_like(team)
+    goals_for[0::2], goals_for[1::2] = home_goals[rows], away_goals[rows]
+    goals_against = np.empty_like(team)
+    goals_against[0::2], goals_against[1::2] = away_goals[rows], home_goals[rows]
+    day = np.repeat(days[rows], 2)
+
+    # Group by team, keeping chronological order inside each group
+    order = np.argsort(team, kind='stable')
+    team, opponent, day = team[order], opponent[order], day[order]
+    goals_for, goals_against = goals_for[order], goals_against[order]
+    first_seen = order
+
+    positions = np.arange(len(team))
+    group_start = np.flatnonzero(np.r_[True, team[1:] != team[:-1]])
+    group_end = np.r_[group_start[1:], len(team)] - 1
+    starts = np.repeat(group_start, group_end - group_start + 1)
+
+    is_win = goals_for > goals_against
+    is_loss = goals_for < goals_against
+
+    # Streak lengths are distances from the end of each group to the last
+    # result that would have reset them
+    last_win = last_position(is_win, positions, starts)[group_end]
+    last_non_win = last_position(~is_win, positions, starts)[group_end]
+    last_loss = last_position(is_loss, positions, starts)[group_end]
+    last_non_loss = last_position(~is_loss, positions, starts)[group_end]
+    winstreak = group_end - last_non_win
+    losestreak = group_end - last_non_loss
+    games_without_win = group_end - last_win
+    games_without_loss = group_end - last_loss
+
+    # match_history holds the unbeaten run, or the current losing run after a
+    # loss, capped at the history depth
+    history_length = np.minimum(np.where(is_loss[group_end], losestreak, games_without_loss),
+                                MAX_HISTORY_DEPTH)
+
+    # last_streak_match is the latest win, or the first loss after a non-loss
+    prev_not_loss = np.r_[False, ~is_loss[:-1]] & (positions != starts)
+    streak_flags = is_win | (is_loss & prev_not_loss)
+    last_streak = last_position(streak_flags, positions, starts)[group_end]
+
+    results = np.where(is_win, 'w', np.where(is_loss, 'l', 'd'))
+    date_cache = {}
+
+    def match_detail(pos):
+        """Build the [date, opponent, result, score] record for an exploded row"""
+        d = int(day[pos])
+        if d not in date_cache:
+            date_cache[d] = day_to_date(d)
+        return [date_cache[d], names[opponent[pos]], str(results[pos]),
+                f"{goals_for[pos]}-{goals_against[pos]}"]
+
+    teams_by_first_seen = np.argsort(first_seen[group_start], kind='stable')
+    teams = {}
+    for g in teams_by_first_seen:
+        start, end = group_start[g], group_end[g]
+        state = TeamState()
+        state.winstreak = int(winstreak[g])
+        state.losestreak = int(losestreak[g])
+        state.games_without_win = int(games_without_win[g])
+        state.games_without_loss = int(games_without_loss[g])
+        state.match_history = new_history(
+            match_detail(pos) for pos in range(end - history_length[g] + 1, end + 1))
+        if last_streak[g] >= start:
+            state.last_streak_match = match_detail(last_streak[g])
+        teams[names[team[start]]] = state
+    return teams
+
+def compute_archive_streaks(archive, registry):
+    """Run the batch engine over every match in a MatchArchive; teams are keyed by registry id"""
+    team_ids = np.array([registry.intern(name) for name in archive.names], dtype=np.int64)
+    home_ids = team_ids[np.asarray(archive.home_ids, dtype=np.int64)]
+    away_ids = team_ids[np.asarray(archive.away_ids, dtype=np.int64)]
+    # Registry ids are both the group keys and the "names" written into the results
+    return compute_streaks(archive.days, home_ids, away_ids,
+                           archive.home_goals, archive.away_goals, range(len(registry.names)),
+                           archive.event_ids)
+
+def replay_archive(archive, registry):
+    """Replay every match in a MatchArchive through process_match"""
+    team_ids = [registry.intern(name) for name in archive.names]
+    teams = {}
+    processed_matches = set()
+    for date in archive.get_dates():
+        for (home_id, away_id, hsc, asc), event_id in zip(archive.get_match_rows(date), archive.get_event_ids(date)):
+            process_match((team_ids[home_id], team_ids[away_id], hsc, asc), teams, processed_matches, date, event_id)
+    return teams
+
+def main():
+    """Benchmark the batch engine against the per-match replay on the saved match history"""
+    archive = load_match_archive()
+    registry = load_registry()
+    print(f"Benchmarking {len(archive.days)} matches across {len(archive.get_dates())} dates")
+
+    start = time.perf_counter()
+    expected = replay_archive(archive, registry)
+    replay_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    teams = compute_archive_streaks(archive, registry)
+    batch_time = time.perf_counter() - start
+
+    print(f"Per-match replay:  {replay_time * 1000:.1f} ms")
+    print(f"Batch engine:      {batch_time * 1000:.1f} ms ({replay_time / batch_time:.1f}x)")
+    identical = (json.dumps(registry.named(teams), default=registry.state_to_json) ==
+                 json.dumps(registry.named(expected), default=registry.state_to_json))
+    print("Outputs identical" if identical else "Outputs DIFFER")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import threading
+import time
+import zlib
+from datetime import date as Date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Size of the real data set that scale 1 reproduces
+BASE_DAYS = 373
+BASE_TEAMS = 4900
+LEAGUE_SIZE = 18           # Teams per synthetic league
+LEAGUES_PER_COUNTRY = 4    # Leagues linked by cup fixtures into one team component
+CUP_CHANCE = 0.02          # Chance per league matchday of an extra cup fixture
+START_DATE = "2023-08-01"  # First archive date; the scrape dates follow the archive
+SCRAPE_DAYS = 7
+GOAL_WEIGHTS = (25, 33, 22, 12, 5, 3)   # Relative frequency of 0..5 goals
+
+DATA_DIR = "benchmark_data"
+RESULTS_FILE = "benchmark_results.json"
+STUB_PATH = "/api/v1/sport/football/scheduled-events/"
+
+def get_dataset_dir(scale, seed):
+    """Return the directory holding the generated data for a scale and seed"""
+    return os.path.join(DATA_DIR, f"scale{scale}-seed{seed}")
+
+def generate_fixtures(scale, seed):
+    """Return {date: [(home, away, home_score, away_score), ...]} for the archive and scrape dates
+
+    Teams play in leagues of LEAGUE_SIZE on a round-robin schedule, one round
+    every one to four weeks, with occasional cup fixtures between leagues of
+    the same country. Scale multiplies the number of leagues.
+    """
+    rnd = random.Random(seed)
+    league_count = max(1, BASE_TEAMS * scale // LEAGUE_SIZE)
+    leagues = [[f"Club {league:05d}-{i:02d}" for i in range(LEAGUE_SIZE)] for league in range(league_count)]
+    start = Date.fromisoformat(START_DATE)
+    dates = [(start + timedelta(days=d)).isoformat() for d in range(BASE_DAYS + SCRAPE_DAYS)]
+    fixtures = {date: [] for date in dates}
+
+    def score():
+        return rnd.choices(range(len(GOAL_WEIGHTS)), GOAL_WEIGHTS)[0]
+
+    for league, teams in enumerate(leagues):
+        interval = rnd.randint(7, 28)
+        order = teams[:]
+        rnd.shuffle(order)
+        country = league - league % LEAGUES_PER_COUNTRY
+        for day in range(rnd.randrange(interval), len(dates), interval):
+            # Circle method: fix the first team and rotate the rest each round
+            day_fixtures = fixtures[dates[day]]
+            for i in range(LEAGUE_SIZE // 2):
+                day_fixtures.append((order[i], order[-1 - i], score(), score()))
+            order = [order[0], order[-1]] + order[1:-1]
+
+            if rnd.random() < CUP_CHANCE:
+                other = leagues[min(league_count - 1, country + rnd.randrange(LEAGUES_PER_COUNTRY))]
+                day_fixtures.append((rnd.choice(teams), rnd.choice(other), score(), score()))
+
+    for day_fixtures in fixtures.values():
+        rnd.shuffle(day_fixtures)
+    return fixtures
+
+def make_event(event_id, date, match):
+    """Return a scheduled event shaped like the API's, including fields the scraper ignores"""
+    home, away, home_score, away_score = match
+    kickoff = datetime.fromisoformat(date).replace(hour=15, tzinfo=timezone.utc)
+    return {
+        "id": event_id,
+        "tournament": {"name": "Synthetic League", "slug": "synthetic-league",
+                       "category": {"name": "Synthetic", "slug": "synthetic", "id": 1},
+                       "uniqueTournament": {"name": "Synthetic League", "id": 1}},
+        "roundInfo": {"round": 1},
+        "customId": f"x{event_id}",
+        "status": {"code": 100, "description": "Ended", "type": "finished"},
+        "winnerCode": 1 if home_score > away_score else 2 if away_score > home_score else 3,
+        "homeTeam": {"name": home, "slug": home.lower().replace(" ", "-"), "shortName": home,
+                     "nameCode": home[:3].upper(), "id": zlib.crc32(home.encode())},
+        "awayTeam": {"name": away, "slug": away.lower().replace(" ", "-"), "shortName": away,
+                     "nameCode": away[:3].upper(), "id": zlib.crc32(away.encode())},
+        "homeScore": {"current": home_score, "display": home_score, "period1": 0, "normaltime": home_score},
+        "awayScore": {"current": away_score, "display": away_score, "period1": 0, "normaltime": away_score},
+        "hasGlobalHighlights": False,
+        "startTimestamp": int(kickoff.timestamp()),
+        "slug": f"{home}-{away}".lower().replace(" ", "-")
+    }
+
+def generate_dataset(scale, seed):
+    """Write the scores_*.txt archive and scheduled-events JSON for a scale and seed"""
+    dataset_dir = get_dataset_dir(scale, seed)
+    scores_dir = os.path.join(dataset_dir, "match_stats")
+    events_dir = os.path.join(dataset_dir, "events")
+    if os.path.exists(os.path.join(dataset_dir, "dataset.json")):
+        return dataset_dir
+
+    print(f"Generating scale {scale} data set (seed {seed})...")
+    fixtures = generate_fixtures(scale, seed)
+    dates = sorted(fixtures)
+    archive_dates, scrape_dates = dates[:BASE_DAYS], dates[BASE_DAYS:]
+    os.makedirs(scores_dir, exist_ok=True)
+    os.makedirs(events_dir, exist_ok=True)
+
+    for date in archive_dates:
+        with open(os.path.join(scores_dir, f"scores_{date}.txt"), 'w', encoding='utf-8') as f:
+            f.write("".join(f"{ht}, {hs}\n{at}, {as_}\n\n" for ht, at, hs, as_ in fixtures[date]))
+
+    event_id = 10_000_000
+    for date in scrape_dates:
+        events = []
+        for match in fixtures[date]:
+            events.append(make_event(event_id, date, match))
+            event_id += 1
+        with open(os.path.join(events_dir, f"{date}.json"), 'w', encoding='utf-8') as f:
+            json.dump({"events": events}, f)
+
+    with open(os.path.join(dataset_dir, "dataset.json"), 'w', encoding='utf-8') as f:
+        json.dump({
+            "scale": scale,
+            "seed": seed,
+            "archive_dates": archive_dates,
+            "scrape_dates": scrape_dates,
+            "matches": sum(len(fixtures[date]) for date in archive_dates)
+        }, f, indent=4)
+    return dataset_dir
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serve scheduled-events payloads from the generated events directory"""
+    protocol_version = "HTTP/1.1"
+    events_dir = None
+
+    def do_GET(self):
+        date = self.path.rsplit('/', 1)[-1]
+        path = os.path.join(self.events_dir, f"{date}.json")
+        body = b'{"events": []}'
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(events_dir):
+    """Start the stub API on a free local port; return (server, base_url)"""
+    handler = type("DatasetStubHandler", (StubHandler,), {"events_dir": os.path.abspath(events_dir)})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}{STUB_PATH}{{date}}"
+
+def time_call(func, repeat=1):
+    """Run func repeat times with its output silenced; return (seconds per run, last result)"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+    return times, result
+
+def get_git_commit():
+    """Return the current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_scenarios(dataset_dir, repeat):
+    """Run every timed scenario inside a fresh working copy of a data set"""
+    from load_from_files import convert_match_files, rebuild_statistics
+    from team_registry import load_registry
+    from team_store import TEAMS_FILE, TeamStore, load_teams
+
+    with open(os.path.join(dataset_dir, "dataset.json"), 'r', encoding='utf-8') as f:
+        dataset = json.load(f)
+    work_dir = os.path.join(dataset_dir, "work")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    shutil.copytree(os.path.join(dataset_dir, "match_stats"), os.path.join(work_dir, "match_stats"))
+    server, base_url = start_stub_server(os.path.join(dataset_dir, "events"))
+
+    results = {}
+
+    def record(name, times, **counts):
+        results[name] = {"runs": len(times), "best": min(times), "median": statistics.median(times), **counts}
+        print(f"{name:<24} best {min(times) * 1000:10.1f} ms   median {statistics.median(times) * 1000:10.1f} ms")
+
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        times, _ = time_call(convert_match_files, repeat)
+        record("convert_match_files", times, dates=len(dataset["archive_dates"]), matches=dataset["matches"])
+
+        def full_rebuild(workers=1):
+            shutil.rmtree("checkpoints", ignore_errors=True)
+            return rebuild_statistics(workers=workers)
+
+        times, teams = time_call(full_rebuild, repeat)
+        record("full_rebuild", times, teams=len(teams))
+        times, _ = time_call(lambda: full_rebuild(workers=0), repeat)
+        record("parallel_rebuild", times, workers=os.cpu_count())
+        times, _ = time_call(lambda: rebuild_statistics(incremental=True), repeat)
+        record("incremental_rebuild_noop", times)
+
+        registry = load_registry()
+        teams = registry.load_states(TeamStore(TEAMS_FILE).load())
+        times, _ = time_call(lambda: TeamStore(TEAMS_FILE).compact(teams, registry), repeat)
+        record("teams_json_save", times, bytes=os.path.getsize(TEAMS_FILE))
+        times, _ = time_call(lambda: load_registry().load_states(TeamStore(TEAMS_FILE).load()), repeat)
+        record("teams_json_load", times)
+
+        import stats
+        stats.BASE_URL = base_url
+        times, _ = time_call(lambda: stats.get_leaderboards(None, 10), repeat)
+        record("stats_global_index", times)
+        all_teams = load_teams(TEAMS_FILE)
+        times, _ = time_call(lambda: stats.rank_teams(all_teams, stats.CATEGORIES, 10), repeat)
+        record("stats_global_json", times)
+        scrape_date = dataset["scrape_dates"][0]
+        times, daily_teams = time_call(lambda: stats.get_daily_teams(scrape_date), repeat)
+        record("stats_daily_fetch", times, teams=len(daily_teams))
+        times, _ = time_call(lambda: stats.get_leaderboards(daily_teams, 3), repeat)
+        record("stats_daily_leaderboards", times)
+
+        # The scrape changes the archive and team state, so it runs once, last
+        import scrape
+        from fetcher import RateLimiter
+        scrape.DATES = dataset["scrape_dates"]
+        scrape.fetcher.base_url = base_url
+        scrape.fetcher.rate_limiter = RateLimiter(0)
+        times, _ = time_call(scrape.main)
+        record("incremental_scrape", times, dates=len(scrape.DATES))
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+    return results
+
+def compare_results(old_path, results):
+    """Print each scenario's best time relative to an earlier results file"""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    print(f"\nCompared with {old_path} ({old.get('commit') or 'unknown commit'}):")
+    for name, result in results["scenarios"].items():
+        previous = old.get("scenarios", {}).get(name)
+        if previous:
+            change = result["best"] / previous["best"] - 1
+            print(f"{name:<24} {previous['best'] * 1000:10.1f} ms -> {result['best'] * 1000:10.1f} ms  ({change:+.1%})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rebuild, scrape and stats pipeline on synthetic data")
+    parser.add_argument("--scale", type=int, choices=(1, 10, 100), default=1,
+                        help="Data set size relative to the real archive (default: 1)")
+    parser.add_argument("--seed", type=int, default=1, help="Generator seed (default: 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per repeatable scenario (default: 3)")
+    parser.add_argument("--output", default=RESULTS_FILE, help=f"Results file (default: {RESULTS_FILE})")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--generate-only", action="store_true", help="Generate the data set and exit")
+
+    args = parser.parse_args()
+
+    dataset_dir = generate_dataset(args.scale, args.seed)
+    if args.generate_only:
+        print(f"Data set written to {dataset_dir}")
+        return
+
+    print(f"Running scenarios on {dataset_dir}...")
+    results = {
+        "commit": get_git_commit(),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "scale": args.scale,
+        "seed": args.seed,
+        "scenarios": run_scenarios(dataset_dir, max(1, args.repeat))
+    }
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare_results(args.compare, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+EVENT_INDEX_FILE = "processed_events.bin"
+
+# File layout: header, sorted uint64 event ids, Bloom filter bits
+MAGIC = b"FSEI"
+HEADER = struct.Struct("<4sIQQ")  # magic, hash count, id count, filter size in bytes
+BITS_PER_EVENT = 10
+HASH_COUNT = 7
+MIN_FILTER_BYTES = 1 << 16
+
+def get_bit_positions(event_id, filter_bits):
+    """Return the Bloom filter bit positions for an event id (double hashing)"""
+    h1 = (event_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    h2 = ((event_id ^ (event_id >> 29)) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF) | 1
+    return [(h1 + i * h2) % filter_bits for i in range(HASH_COUNT)]
+
+def merge_sorted_ids(ids, new_ids):
+    """Return a sorted array of ids with the sorted new_ids inserted
+
+    Each new id is placed by binary search and the runs of existing ids
+    between them are copied as slices, so a small batch costs a few memory
+    copies rather than a sort of the whole array.
+    """
+    merged = array('Q')
+    start = 0
+    for event_id in new_ids:
+        pos = bisect_left(ids, event_id, start)
+        merged.extend(ids[start:pos])
+        merged.append(event_id)
+        start = pos
+    merged.extend(ids[start:])
+    return merged
+
+class EventIndex:
+    """Persistent set of processed API event ids: a Bloom filter in front of a sorted id array
+
+    Lookups of unseen events are answered by the filter alone; possible hits
+    are confirmed by binary search. Keys that are not event ids (such as the
+    (home, away, score) tuples used when an event has no id) are kept in
+    memory for the current run only.
+    """
+
+    def __init__(self, path=EVENT_INDEX_FILE):
+        """Initialize an empty index bound to a file path"""
+        self.path = path
+        self.ids = array('Q')
+        self.filter = bytearray(MIN_FILTER_BYTES)
+        self.added = set()
+        self.other_keys = set()
+
+    def load(self):
+        """Load the sorted ids and Bloom filter from disk"""
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path, 'rb') as f:
+            magic, hash_count, count, filter_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or hash_count != HASH_COUNT:
+                raise ValueError(f"{self.path} is not an event index")
+            self.ids = array('Q')
+            self.ids.frombytes(f.read(count * self.ids.itemsize))
+            self.filter = bytearray(f.read(filter_size))
+        self.added = set()
+        return self
+
+    def _filter_contains(self, event_id):
+        """Return False if the event id is definitely not in the filter"""
+        bits = self.filter
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in get_bit_positions(event_id, len(bits) * 8))
+
+    def _filter_add(self, event_id):
+        """Set the event id's bits in the filter"""
+        bits = self.filter
+        for pos in get_bit_positions(event_id, len(bits) * 8):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        """Return True if the event id (or other key) has been processed"""
+        if not isinstance(key, int):
+            return key in self.other_keys
+        if key in self.added:
+            return True
+        if not self._filter_contains(key):
+            return False
+        idx = bisect_left(self.ids, key)
+        return idx < len(self.ids) and self.ids[idx] == key
+
+    def add(self, key):
+        """Mark an event id (or other key) as processed"""
+        if not isinstance(key, int):
+            self.other_keys.add(key)
+            return
+        if key in self:
+            return
+        self.added.add(key)
+        self._filter_add(key)
+
+    def __len__(self):
+        """Return the number of stored event ids"""
+        return len(self.ids) + len(self.added)
+
+    def save(self):
+        """Merge new ids into the sorted array and write the index atomically"""
+        if not self.added and os.path.exists(self.path):
+            return
+        if self.added:
+            self.ids = merge_sorted_ids(self.ids, sorted(self.added))
+            self.added = set()
+
+        # Grow the filter once it is too small for a low false-positive rate
+        wanted = max(MIN_FILTER_BYTES, len(self.ids) * BITS_PER_EVENT // 8)
+        if len(self.filter) < wanted:
+            self.filter = bytearray(1 << (wanted - 1).bit_length())
+            for event_id in self.ids:
+                self._filter_add(event_id)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, HASH_COUNT, len(self.ids), len(self.filter)))
+            f.write(self.ids.tobytes())
+            f.write(self.filter)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,281 @@
+import codecs
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+FINISHED_STATUS = "finished"
+LIVE_STATUSES = {"notstarted", "inprogress"}   # Events whose result can still change
+RECENT_TTL = 10 * 60            # Cache lifetime for today and future dates
+UNFINISHED_TTL = 6 * 60 * 60    # Cache lifetime for past dates with unfinished matches (or no events)
+STREAM_CHUNK_SIZE = 64 * 1024   # Bytes read from the response body at a time
+
+# The few event fields the scraper and stats use
+Fixture = namedtuple("Fixture", "event_id home_team away_team home_score away_score status start_timestamp "
+                                "country tournament")
+
+class NotCachedError(LookupError):
+    """Raised for an offline fetch of a date with no cached response"""
+
+def get_events_ttl(date, event_count, any_live):
+    """Return how long a date's events may be cached; None means permanently
+
+    A past date is final once none of its events is still to start or in
+    progress: finished, postponed, canceled and abandoned events will not
+    change. An empty event list may be an API hiccup, so it expires too.
+    """
+    if date >= datetime.now().strftime("%Y-%m-%d"):
+        return RECENT_TTL
+    if event_count and not any_live:
+        return None
+    return UNFINISHED_TTL
+
+def extract_fixture(event):
+    """Reduce a scheduled event to a Fixture"""
+    tournament = event.get('tournament') or {}
+    unique_tournament = tournament.get('uniqueTournament') or tournament
+    return Fixture(
+        event.get('id'),
+        event['homeTeam']['name'],
+        event['awayTeam']['name'],
+        event.get('homeScore', {}).get('current', None),
+        event.get('awayScore', {}).get('current', None),
+        event.get('status', {}).get('type'),
+        event.get('startTimestamp'),
+        (tournament.get('category') or {}).get('name'),
+        unique_tournament.get('name')
+    )
+
+def iter_array_items(chunks, key="events"):
+    """Yield the items of a top-level JSON array one by one as byte chunks arrive
+
+    Only one item is decoded at a time, so the payload is never held as a
+    single parsed document. Raises ValueError if the body ends mid-array.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    marker = json.dumps(key)
+    buffer = ""
+    pos = None      # Position of the next item once inside the array
+    for chunk in chunks:
+        buffer += text.decode(chunk)
+        if pos is None:
+            start = buffer.find(marker)
+            bracket = buffer.find('[', start + len(marker)) if start != -1 else -1
+            if bracket == -1:
+                continue
+            pos = bracket + 1
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == ']':
+                return
+            try:
+                item, pos_after = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # The item is incomplete; wait for the next chunk
+                break
+            yield item
+            pos = pos_after
+        buffer = buffer[pos:]
+        pos = 0
+
+    if pos is not None:
+        raise ValueError(f"Response ended inside the {key} array")
+
+def iter_fixtures(chunks):
+    """Yield a Fixture for each scheduled event decoded from byte chunks"""
+    for event in iter_array_items(chunks, "events"):
+        try:
+            yield extract_fixture(event)
+        except (KeyError, TypeError) as e:
+            print(f"Error processing match: Missing key {e}")
+
+class RateLimiter:
+    """Space out requests to the same host by a minimum interval"""
+
+    def __init__(self, requests_per_second):
+        """Initialize the limiter with the allowed requests per second per host"""
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """Block until a request to the url's host is allowed"""
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class DateFetcher:
+    """Fetch scheduled events for many dates over a shared keep-alive session"""
+
+    def __init__(self, base_url, headers=None, max_workers=8, requests_per_second=4, timeout=10,
+                 cache=None, offline=False, refresh=False, metrics=None):
+        """Initialize the pooled session, worker limit, rate limiter and optional response cache
+
+        offline serves only cached responses, expired or not; refresh always
+        goes to the network but still stores the responses in the cache.
+        With a RunMetrics, fetch (network) and parse time is recorded per date.
+        """
+        self.base_url = base_url
+        self.cache = cache
+        self.metrics = metrics
+        self.offline = offline
+        self.refresh = refresh
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(requests_per_second)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def stream_fixtures(self, date):
+        """Yield a date's fixtures as the response body arrives, reading through the response cache
+
+        Events are parsed chunk by chunk, so the parsed-object footprint stays
+        small; with a cache the raw chunks are still kept until the end to be
+        stored, so the body itself is held in memory either way.
+        """
+        # Time spent in this generator, less the time spent rate limited or reading the cache or network, is parse time
+        timing = {"busy": 0.0, "fetch": 0.0, "throttle": 0.0}
+        resumed = time.perf_counter()
+        if self.cache and not self.refresh:
+            # Offline replays accept expired entries rather than going to the network
+            body = self.cache.get(date, allow_expired=self.offline)
+            timing["fetch"] += time.perf_counter() - resumed
+            if body is not None:
+                for fixture in iter_fixtures([body]):
+                    timing["busy"] += time.perf_counter() - resumed
+                    yield fixture
+                    resumed = time.perf_counter()
+                timing["busy"] += time.perf_counter() - resumed
+                self._record_timing(date, timing)
+                return
+        if self.offline:
+            raise NotCachedError(f"No cached events for {date}")
+
+        url = self.base_url.format(date=date)
+        request_start = time.perf_counter()
+        self.rate_limiter.wait(url)
+        timing["throttle"] += time.perf_counter() - request_start
+        request_start = time.perf_counter()
+        body = []
+        event_count = 0
+        any_live = False
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            timing["fetch"] += time.perf_counter() - request_start
+            response.raise_for_status()
+
+            def read_chunks():
+                chunks = response.iter_content(STREAM_CHUNK_SIZE)
+                while True:
+                    start = time.perf_counter()
+                    chunk = next(chunks, None)
+                    timing["fetch"] += time.perf_counter() - start
+                    if chunk is None:
+                        return
+                    if self.cache:
+                        # The compact raw body is kept for the cache, not the parsed events
+                        body.append(chunk)
+                    yield chunk
+
+            for fixture in iter_fixtures(read_chunks()):
+                event_count += 1
+                any_live = any_live or fixture.status in LIVE_STATUSES
+                timing["busy"] += time.perf_counter() - resumed
+                yield fixture
+                resumed = time.perf_counter()
+        timing["busy"] += time.perf_counter() - resumed
+        self._record_timing(date, timing)
+
+        if self.cache:
+            self.cache.put(date, b"".join(body), get_events_ttl(date, event_count, any_live))
+
+    def _record_timing(self, date, timing):
+        """Report a date's rate-limit wait, fetch and parse time to the run metrics, if any"""
+        if self.metrics:
+            self.metrics.add_time("throttle", timing["throttle"], date)
+            self.metrics.add_time("fetch", timing["fetch"], date)
+            self.metrics.add_time("parse", timing["busy"] - timing["fetch"] - timing["throttle"], date)
+
+    def fetch_if_changed(self, date, etag=None, last_modified=None):
+        """Conditionally fetch a date's fixtures, bypassing the cache
+
+        Returns (fixtures, etag, last_modified); fixtures is None when the
+        server answers 304 Not Modified to the validators from the last poll.
+        """
+        url = self.base_url.format(date=date)
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        self.rate_limiter.wait(url)
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304:
+                return None, etag, last_modified
+            response.raise_for_status()
+            fixtures = list(iter_fixtures(response.iter_content(STREAM_CHUNK_SIZE)))
+            return fixtures, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    def try_fixtures(self, date):
+        """Fetch the list of fixtures for a single date; return (fixtures, exception or None)"""
+        try:
+            return list(self.stream_fixtures(date)), None
+        except Exception as e:
+            if self.metrics:
+                self.metrics.count("fetch_errors")
+            return [], e
+
+    def get_fixtures(self, date):
+        """Fetch the list of fixtures for a single date; errors are printed and give an empty list"""
+        fixtures, error = self.try_fixtures(date)
+        if error is not None:
+            print(f"Error fetching {date}: {str(error)}")
+        return fixtures
+
+    def fetch_in_order(self, dates, fetch=None):
+        """Yield (date, result of fetch(date)) in the order given while fetching ahead concurrently
+
+        fetch defaults to get_fixtures; pass try_fixtures to see which dates failed.
+        """
+        fetch = fetch or self.get_fixtures
+        # Keep a bounded window of requests in flight so results are handed
+        # back strictly in order without buffering the whole date range
+        window = self.max_workers * 2
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            for date in dates:
+                pending.append((date, executor.submit(fetch, date)))
+                if len(pending) >= window:
+                    done_date, future = pending.popleft()
+                    yield done_date, future.result()
+            while pending:
+                done_date, future = pending.popleft()
+                yield done_date, future.result()
+
+    def close(self):
+        """Close the underlying session and its pooled connections"""
+        self.session.close()
+        if self.cache:
+            self.cache.save()
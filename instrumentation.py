@@ -0,0 +1,144 @@
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:   # Not available on Windows
+    resource = None
+
+METRICS_FILE = "run_metrics.jsonl"
+PROFILE_DIR = "profiles"
+
+class RunMetrics:
+    """Per-stage timers, counters and optional profiling for one run of a script"""
+
+    def __init__(self, run_name):
+        """Initialize empty timers and counters for a named run"""
+        self.run_name = run_name
+        self.started = datetime.now()
+        self._start_time = time.perf_counter()
+        self.stage_totals = defaultdict(float)
+        self.date_stages = {}
+        self.counters = Counter()
+        self.throughput_stages = {}
+        self._lock = threading.Lock()
+        self._profiler = None
+        self._trace_memory = False
+        self.profile_path = None
+
+    def add_time(self, stage, seconds, date=None):
+        """Add time spent in a stage, optionally attributed to a date"""
+        with self._lock:
+            self.stage_totals[stage] += seconds
+            if date is not None:
+                stages = self.date_stages.setdefault(date, {})
+                stages[stage] = stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage, date=None):
+        """Time the enclosed block as a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start, date)
+
+    def count(self, name, amount=1):
+        """Increase a counter"""
+        with self._lock:
+            self.counters[name] += amount
+
+    def track_throughput(self, stage, counter):
+        """Report a counter per second of time spent in a stage in the summary"""
+        self.throughput_stages[stage] = counter
+
+    def get_throughput(self, stage, counter):
+        """Return a counter's units per second of time spent in a stage, or None if the stage took no time"""
+        seconds = self.stage_totals.get(stage)
+        if not seconds:
+            return None
+        return self.counters[counter] / seconds
+
+    def format_throughput(self):
+        """Return one line summarizing the tracked stages' throughput"""
+        parts = []
+        for stage, counter in self.throughput_stages.items():
+            rate = self.get_throughput(stage, counter)
+            if rate is not None:
+                parts.append(f"{stage} {self.stage_totals[stage]:.2f}s ({rate:,.0f} {counter}/s)")
+        return ", ".join(parts)
+
+    def end_date(self, date):
+        """Record the traced memory in use once a date is finished (with trace_memory only)"""
+        if self._trace_memory:
+            current, _ = tracemalloc.get_traced_memory()
+            with self._lock:
+                self.date_stages.setdefault(date, {})["memory_kb"] = current // 1024
+
+    def start_profiling(self, profile=False, trace_memory=False):
+        """Enable cProfile and/or tracemalloc for the rest of the run"""
+        if trace_memory:
+            tracemalloc.start()
+            self._trace_memory = True
+        if profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profiling(self):
+        """Disable profiling and write the cProfile stats file"""
+        if self._profiler is None:
+            return
+        self._profiler.disable()
+        if not os.path.exists(PROFILE_DIR):
+            os.makedirs(PROFILE_DIR)
+        self.profile_path = os.path.join(PROFILE_DIR, f"{self.run_name}_{self.started:%Y%m%d_%H%M%S}.prof")
+        self._profiler.dump_stats(self.profile_path)
+        self._profiler = None
+
+    def summary(self):
+        """Return the run summary record"""
+        record = {
+            "run": self.run_name,
+            "started": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+            "duration": round(time.perf_counter() - self._start_time, 4),
+            "stages": {stage: round(seconds, 4) for stage, seconds in self.stage_totals.items()},
+            "counters": dict(self.counters),
+            "throughput": {stage: round(self.get_throughput(stage, counter) or 0, 1)
+                           for stage, counter in self.throughput_stages.items()},
+            "dates": {date: {stage: round(value, 4) for stage, value in stages.items()}
+                      for date, stages in sorted(self.date_stages.items())}
+        }
+        if self._trace_memory:
+            record["traced_peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux
+            record["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if self.profile_path:
+            record["profile"] = self.profile_path
+        return record
+
+    def write_summary(self, path=METRICS_FILE):
+        """Stop profiling and append the run summary as one JSON line"""
+        self.stop_profiling()
+        record = self.summary()
+        if self._trace_memory:
+            tracemalloc.stop()
+            self._trace_memory = False
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"Run summary appended to {path}")
+        return record
+
+def add_profiling_arguments(parser):
+    """Add the --profile and --trace-memory options to an argument parser"""
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Profile the run with cProfile (stats written to {PROFILE_DIR}/)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Track memory with tracemalloc and record it per date")
@@ -0,0 +1,153 @@
+import json
+import os
+import re
+from datetime import date as Date
+
+from atomic_file import write_json_atomic
+from match_store import day_to_date
+from team_index import TeamIndex, build_index, update_index
+
+LEAGUES_DIR = "leagues"
+LEAGUES_FILE = os.path.join(LEAGUES_DIR, "leagues.json")
+MEMBERSHIP_DAYS = 365   # A team belongs to a league while it has played in it within this many days
+
+def get_league_key(country, tournament):
+    """Return the file-safe shard key for a (country, tournament) pair"""
+    text = f"{country or 'unknown'} {tournament}".lower()
+    return re.sub(r"[^a-z0-9]+", "-", text).strip("-")
+
+def league_matches(query, country, tournament):
+    """Return True if a --league query names this league's key, tournament or country (case-insensitive)"""
+    if not tournament:
+        return False
+    query = query.lower()
+    return query in (get_league_key(country, tournament), tournament.lower(), (country or "").lower())
+
+class LeagueStore:
+    """Team statistics sharded by tournament: a manifest of each league's teams plus one index file per league
+
+    The canonical team state stays in teams.json, since a team's streaks run
+    across every competition it plays in; each shard holds the records of the
+    teams in one league so that league queries open only that shard.
+    """
+
+    def __init__(self, directory=LEAGUES_DIR):
+        """Initialize an empty store bound to a directory"""
+        self.directory = directory
+        self.path = os.path.join(directory, os.path.basename(LEAGUES_FILE))
+        # {key: {"country": ..., "tournament": ..., "teams": {name: last date played in the league}}}
+        self.leagues = {}
+        self.team_leagues = {}   # name -> keys of the leagues the team has played in
+        self.changed = False     # Membership differs from the saved manifest
+
+    def load(self):
+        """Read the manifest, if there is one"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.leagues = json.load(f)
+        except FileNotFoundError:
+            self.leagues = {}
+        self.team_leagues = {}
+        for key, entry in self.leagues.items():
+            for name in entry["teams"]:
+                self.team_leagues.setdefault(name, set()).add(key)
+        self.changed = False
+        return self
+
+    def save(self):
+        """Write the manifest to a temporary file and move it into place"""
+        os.makedirs(self.directory, exist_ok=True)
+        write_json_atomic(self.path, self.leagues, indent=4)
+        self.changed = False
+
+    def get_shard_path(self, key):
+        """Return the index file of a league"""
+        return os.path.join(self.directory, f"{key}.db")
+
+    def add_match(self, date, home_team, away_team, league):
+        """Record that two teams (canonical names) played in a league on a date
+
+        Returns the league key, or None for a match without a league.
+        """
+        if not league or not league[1]:
+            return None
+        country, tournament = league
+        key = get_league_key(country, tournament)
+        entry = self.leagues.setdefault(key, {"country": country, "tournament": tournament, "teams": {}})
+        members = entry["teams"]
+        for team in (home_team, away_team):
+            if members.get(team, "") < date:
+                members[team] = date
+                self.changed = True
+            self.team_leagues.setdefault(team, set()).add(key)
+        return key
+
+    def update(self, teams, registry, team_ids):
+        """Upsert changed teams into every shard they appear in and save the manifest if membership changed
+
+        A team's record changes whatever competition it played in, so each
+        league the team has ever played in is updated; no other shard is opened.
+        The manifest is only rewritten when add_match() recorded a new member
+        or a later match date, not on every flush of the same matchday.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        changed = {}
+        for team_id in team_ids:
+            for key in self.team_leagues.get(registry.names[team_id], ()):
+                changed.setdefault(key, set()).add(team_id)
+        for key, changed_ids in changed.items():
+            members = (registry.lookup(name) for name in self.leagues[key]["teams"])
+            shard = {team_id: teams[team_id] for team_id in members if team_id in teams}
+            update_index(shard, changed_ids & shard.keys(), registry, self.get_shard_path(key))
+        if self.changed:
+            self.save()
+
+    def rebuild(self, archive, teams, registry):
+        """Rebuild the manifest and every shard from the leagues recorded in the match archive"""
+        self.leagues = {}
+        self.team_leagues = {}
+        leagues = archive.leagues
+        names = [registry.canonical_name(name) for name in archive.names]
+        dates = {}
+        columns = zip(archive.days, archive.home_ids, archive.away_ids, archive.league_ids)
+        for day, home_id, away_id, league_id in columns:
+            if not league_id:
+                continue
+            date = dates.get(day)
+            if date is None:
+                date = dates[day] = day_to_date(day)
+            self.add_match(date, names[home_id], names[away_id], leagues[league_id])
+
+        os.makedirs(self.directory, exist_ok=True)
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".db"):
+                os.remove(os.path.join(self.directory, filename))
+        for key, entry in self.leagues.items():
+            members = {registry.lookup(name) for name in entry["teams"]}
+            shard = {team_id: state for team_id, state in teams.items() if team_id in members}
+            build_index(shard, registry, self.get_shard_path(key))
+        self.save()
+        print(f"Rebuilt {len(self.leagues)} league shards in {self.directory}")
+
+    def find_leagues(self, query):
+        """Return the keys of the leagues whose key, tournament or country matches query (case-insensitive)"""
+        return [key for key, entry in self.leagues.items()
+                if league_matches(query, entry["country"], entry["tournament"])]
+
+    def get_members(self, key):
+        """Return the teams that have played in a league within MEMBERSHIP_DAYS of its latest match"""
+        members = self.leagues[key]["teams"]
+        if not members:
+            return []
+        latest = Date.fromisoformat(max(members.values())).toordinal()
+        return [name for name, last_date in members.items()
+                if latest - Date.fromisoformat(last_date).toordinal() <= MEMBERSHIP_DAYS]
+
+    def open_shard(self, key):
+        """Open a league's index, or return None if it has not been built"""
+        path = self.get_shard_path(key)
+        return TeamIndex(path) if os.path.exists(path) else None
+
+def load_league_store(directory=LEAGUES_DIR):
+    """Return the league store with its manifest loaded"""
+    return LeagueStore(directory).load()
@@ -0,0 +1,127 @@
+import argparse
+import time
+from datetime import datetime
+
+from event_index import EVENT_INDEX_FILE, EventIndex
+from fetcher import FINISHED_STATUS, LIVE_STATUSES, DateFetcher
+from load_from_files import convert_match_files
+from match_store import ARCHIVE_FILE
+from scrape import (BASE_URL, HEADERS, REQUESTS_PER_SECOND, match_archive, match_logger, process_matches,
+                    registry, save_data, team_store)
+
+POLL_INTERVAL = 30      # Seconds between polls of the day's fixtures
+FLUSH_INTERVAL = 120    # Seconds between writes of newly applied matches
+
+def get_today():
+    """Return today's date as YYYY-MM-DD"""
+    return datetime.now().strftime("%Y-%m-%d")
+
+class MatchdayPoller:
+    """Poll one date's fixtures with conditional requests and report matches as they finish"""
+
+    def __init__(self, fetcher, date):
+        """Initialize the poller for a date with no previous poll"""
+        self.fetcher = fetcher
+        self.date = date
+        self.etag = None
+        self.last_modified = None
+        self.statuses = {}
+
+    def poll(self):
+        """Return the fixtures that have finished since the previous poll
+
+        An unchanged payload (304 Not Modified) is not downloaded or parsed.
+        """
+        fixtures, self.etag, self.last_modified = self.fetcher.fetch_if_changed(
+            self.date, self.etag, self.last_modified)
+        if fixtures is None:
+            return []
+
+        finished = []
+        for fixture in fixtures:
+            key = fixture.event_id or fixture[1:3]
+            if fixture.status == FINISHED_STATUS and self.statuses.get(key) != FINISHED_STATUS:
+                finished.append(fixture)
+            self.statuses[key] = fixture.status
+        return finished
+
+    def is_complete(self):
+        """Return True once no fixture of the date is still to start or in progress"""
+        return bool(self.statuses) and not LIVE_STATUSES.intersection(self.statuses.values())
+
+def flush(date, match_records, teams, processed_matches):
+    """Write applied matches for a date still in progress"""
+    if not match_records:
+        return
+    save_data(date, match_records, teams, partial=True)
+    processed_matches.save()
+    team_store.compact_if_needed(teams, registry)
+    match_records.clear()
+
+def run(base_url=BASE_URL, date=None, poll_interval=POLL_INTERVAL, flush_interval=FLUSH_INTERVAL,
+        until_finished=False):
+    """Poll a date (today, following the clock past midnight, by default) until interrupted
+
+    Newly finished matches are applied to the in-memory team state as soon as
+    they are seen and flushed every flush_interval seconds. Dates are only
+    committed as partial, so the next scrape still fetches the full day and
+    skips the matches applied here by their event ids.
+    """
+    teams = registry.load_states(team_store.load())
+    if not match_archive.exists():
+        convert_match_files(ARCHIVE_FILE)
+    match_archive.load()
+    processed_matches = EventIndex(EVENT_INDEX_FILE).load()
+
+    fetcher = DateFetcher(base_url, HEADERS, max_workers=1, requests_per_second=REQUESTS_PER_SECOND)
+    poller = MatchdayPoller(fetcher, date or get_today())
+    match_records = []
+    last_flush = time.monotonic()
+    print(f"Polling {poller.date} every {poll_interval}s, flushing every {flush_interval}s")
+
+    try:
+        while True:
+            try:
+                finished = poller.poll()
+            except Exception as e:
+                print(f"Error polling {poller.date}: {str(e)}")
+                finished = []
+
+            if finished:
+                records = process_matches(poller.date, finished, teams, processed_matches)
+                for home_team, away_team, home_score, away_score, *_ in records:
+                    print(f"{poller.date} finished: {home_team} {home_score}-{away_score} {away_team}")
+                match_records.extend(records)
+
+            if time.monotonic() - last_flush >= flush_interval:
+                flush(poller.date, match_records, teams, processed_matches)
+                last_flush = time.monotonic()
+
+            if until_finished and poller.is_complete():
+                print(f"All matches on {poller.date} are over")
+                break
+            if date is None and get_today() != poller.date:
+                # The previous day was polled one last time above; move on to the new day
+                flush(poller.date, match_records, teams, processed_matches)
+                poller = MatchdayPoller(fetcher, get_today())
+                print(f"Polling {poller.date}")
+                continue
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        flush(poller.date, match_records, teams, processed_matches)
+        fetcher.close()
+        match_logger.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply today's results to team statistics as matches finish")
+    parser.add_argument("--date", help="Poll this date (YYYY-MM-DD) instead of following today's date")
+    parser.add_argument("--base-url", default=BASE_URL, help="Scheduled-events URL with a {date} placeholder")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="Seconds between polls")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL,
+                        help="Seconds between writes of newly finished matches")
+    parser.add_argument("--until-finished", action="store_true",
+                        help="Exit once every match of the date is over")
+    args = parser.parse_args()
+    run(args.base_url, args.date, args.poll_interval, args.flush_interval, args.until_finished)
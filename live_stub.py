@@ -0,0 +1,156 @@
+import argparse
+import json
+import random
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmark import STUB_PATH, make_event
+
+DURATION = 300          # Seconds the replayed matchday lasts
+MATCH_SHARE = 0.3       # Share of the duration each match is in progress
+
+def make_timeline(events, duration, seed):
+    """Return per-event (kickoff, goal times, end) offsets for a replay of finished events"""
+    rnd = random.Random(seed)
+    length = duration * MATCH_SHARE
+    timeline = []
+    for event in events:
+        kickoff = rnd.uniform(0, duration - length)
+        goals = sorted([(rnd.uniform(kickoff, kickoff + length), "homeScore")
+                        for _ in range(event["homeScore"]["current"])] +
+                       [(rnd.uniform(kickoff, kickoff + length), "awayScore")
+                        for _ in range(event["awayScore"]["current"])])
+        timeline.append((kickoff, goals, kickoff + length))
+    return timeline
+
+def get_event_at(event, kickoff, goals, end, elapsed):
+    """Return the event as the API would have shown it `elapsed` seconds into the replay"""
+    event = dict(event)
+    if elapsed < kickoff:
+        event["status"] = {"code": 0, "description": "Not started", "type": "notstarted"}
+        event["homeScore"], event["awayScore"] = {}, {}
+        return event
+    if elapsed < end:
+        event["status"] = {"code": 6, "description": "1st half", "type": "inprogress"}
+        for side in ("homeScore", "awayScore"):
+            score = sum(1 for goal_time, goal_side in goals if goal_side == side and goal_time <= elapsed)
+            event[side] = {"current": score, "display": score}
+    return event
+
+class MatchdayReplay:
+    """A day's finished events played back over a few minutes: kickoffs, goals and final whistles"""
+
+    def __init__(self, events, duration=DURATION, seed=1):
+        """Schedule the replay; it starts when the object is created"""
+        self.events = events
+        self.timeline = make_timeline(events, duration, seed)
+        self.started = time.time()
+        # Every moment the payload changes, so unchanged polls can be answered with 304
+        self.changes = sorted({0.0}.union(*({kickoff, end, *(t for t, _ in goals)}
+                                            for kickoff, goals, end in self.timeline)))
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def get_version(self):
+        """Return the number of payload changes so far"""
+        return bisect_right(self.changes, time.time() - self.started)
+
+    def get_body(self, version):
+        """Return the JSON payload for a version, building each one once"""
+        with self._lock:
+            body = self._bodies.get(version)
+            if body is None:
+                elapsed = self.changes[version - 1]
+                events = [get_event_at(event, *timing, elapsed) for event, timing in zip(self.events, self.timeline)]
+                body = self._bodies[version] = json.dumps({"events": events}).encode('utf-8')
+            return body
+
+    def get_last_modified(self, version):
+        """Return the HTTP date of a version's change"""
+        return formatdate(self.started + self.changes[version - 1], usegmt=True)
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serve the replay for its date, honouring If-None-Match, and an empty day for other dates"""
+    protocol_version = "HTTP/1.1"
+    replay = None
+    date = None
+
+    def do_GET(self):
+        date = self.path.rsplit('/', 1)[-1]
+        if date != self.date:
+            self.send_body(b'{"events": []}')
+            return
+
+        version = self.replay.get_version()
+        etag = f'"{version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_body(self.replay.get_body(version), etag, self.replay.get_last_modified(version))
+
+    def send_body(self, body, etag=None, last_modified=None):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def make_events(date, matches, seed):
+    """Return finished events for a synthetic matchday"""
+    rnd = random.Random(seed)
+    teams = [f"Live Club {i:03d}" for i in range(matches * 2)]
+    rnd.shuffle(teams)
+    return [make_event(90_000_000 + i, date, (teams[2 * i], teams[2 * i + 1],
+                                              rnd.choice((0, 0, 1, 1, 1, 2, 2, 3)), rnd.choice((0, 0, 1, 1, 2, 3))))
+            for i in range(matches)]
+
+def start_replay_server(events, date, duration=DURATION, seed=1, port=0):
+    """Start the replay on a local port; return (server, base_url)"""
+    handler = type("MatchdayReplayHandler", (ReplayHandler,),
+                   {"replay": MatchdayReplay(events, duration, seed), "date": date})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}{STUB_PATH}{{date}}"
+
+def main():
+    """Serve a replayed matchday until interrupted"""
+    parser = argparse.ArgumentParser(description="Stub scheduled-events API that replays a day's score changes")
+    parser.add_argument("--events", help="Scheduled-events JSON with final scores (default: a synthetic day)")
+    parser.add_argument("--date", default=datetime.now().strftime("%Y-%m-%d"), help="Date the replay is served for")
+    parser.add_argument("--matches", type=int, default=40, help="Matches in the synthetic day")
+    parser.add_argument("--duration", type=float, default=DURATION, help="Seconds the replay lasts")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.events:
+        with open(args.events, 'r', encoding='utf-8') as f:
+            events = [event for event in json.load(f)["events"]
+                      if event.get("homeScore", {}).get("current") is not None
+                      and event.get("awayScore", {}).get("current") is not None]
+    else:
+        events = make_events(args.date, args.matches, args.seed)
+
+    server, base_url = start_replay_server(events, args.date, args.duration, args.seed, args.port)
+    print(f"Replaying {len(events)} matches on {args.date} over {args.duration:.0f}s")
+    print(f"python live.py --date {args.date} --base-url {base_url} --poll-interval 2 --flush-interval 10")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
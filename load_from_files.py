@@ -1,22 +1,33 @@
+import argparse
 import os
 import json
+import struct
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from atomic_file import write_json_atomic
+from instrumentation import RunMetrics, add_profiling_arguments
+from league_store import LEAGUES_FILE, LeagueStore, load_league_store
+from match_store import ARCHIVE_FILE, MatchArchive
+from parallel_rebuild import rebuild_parallel
+from streak_engine import apply_match
+from team_index import build_index, update_index
+from team_registry import load_registry
+from team_store import TEAMS_FILE, TeamStore
 
 OUTPUT_DIR = "match_stats"
-
-def initialize_team():
-    """Return a new team structure with default values"""
-    return {
-        "winstreak": 0,
-        "losestreak": 0,
-        "games_without_win": 0,
-        "games_without_loss": 0,
-        "match_history": [],
-        "last_streak_match": None
-    }
+MATCH_FILE_STAMPS = os.path.join(OUTPUT_DIR, "matches.files.json")   # Size/mtime of each text file last read
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_MANIFEST = os.path.join(CHECKPOINT_DIR, "manifest.json")
+CHECKPOINT_INTERVAL = 30   # Dates replayed between checkpoints
+MAX_CHECKPOINTS = 8        # Older checkpoints are pruned
+MATCHES_HEADER = struct.Struct("<QQ")  # event id count, (home, away, score) key count
+READERS = 4                # Threads reading and parsing match files ahead of the consumer
+PREFETCH_DATES = 16        # Parsed dates held in memory ahead of the consumer at most
 
 def get_available_dates():
-    """Get list of dates with saved match data"""
+    """Get list of dates with saved scores_YYYY-MM-DD.txt files"""
     if not os.path.exists(OUTPUT_DIR):
         print(f"Error: {OUTPUT_DIR} directory not found")
         return []
@@ -34,7 +45,7 @@ def get_available_dates():
     return sorted(dates)
 
 def load_match_data(date):
-    """Load match data from saved file for a specific date"""
+    """Load (home_team, away_team, home_score, away_score) tuples from a date's text file"""
     file_path = os.path.join(OUTPUT_DIR, f"scores_{date}.txt")
     
     if not os.path.exists(file_path):
@@ -56,8 +67,9 @@ def load_match_data(date):
             # Split into home and away team lines
             lines = block.strip().split('\n')
             if len(lines) >= 2:
-                home_data = lines[0].split(', ')
-                away_data = lines[1].split(', ')
+                # Split on the last separator so team names may contain ", "
+                home_data = lines[0].rsplit(', ', 1)
+                away_data = lines[1].rsplit(', ', 1)
                 
                 if len(home_data) >= 2 and len(away_data) >= 2:
                     home_team = home_data[0]
@@ -65,183 +77,419 @@ def load_match_data(date):
                     away_team = away_data[0]
                     away_score = int(away_data[1])
                     
-                    matches.append({
-                        "home_team": home_team,
-                        "away_team": away_team,
-                        "home_score": home_score,
-                        "away_score": away_score
-                    })
+                    matches.append((home_team, away_team, home_score, away_score))
     
     except Exception as e:
         print(f"Error loading data for {date}: {e}")
     
     return matches
 
-def process_match(match, teams, processed_matches, date):
-    """Process a single match and update team statistics"""
-    ht = match["home_team"]
-    at = match["away_team"]
-    hsc = match["home_score"]
-    asc = match["away_score"]
-    
-    # Create unique match identifier
-    match_id = (ht, at, hsc, asc)
-    
-    # Skip if match already processed
-    if match_id in processed_matches:
-        return
-    processed_matches.add(match_id)
-    
-    # Initialize teams if they don't exist
-    if ht not in teams:
-        teams[ht] = initialize_team()
-    if at not in teams:
-        teams[at] = initialize_team()
-    
-    # Determine match result
-    if hsc > asc:
-        ht_result = 'w'
-        at_result = 'l'
-    elif hsc < asc:
-        ht_result = 'l'
-        at_result = 'w'
-    elif hsc == asc:
-        ht_result = 'd'
-        at_result = 'd'
-    else:
-        # This should not happen with properly formatted files, but just in case
-        print(f"Unexpected score situation: {ht} {hsc} - {asc} {at}")
-        return
-    
-    # Create compact match records with date and score
-    ht_match_detail = [
-        date,           # date
-        at,             # opponent
-        ht_result,      # result (w/l/d)
-        f"{hsc}-{asc}"  # score
-    ]
-    
-    at_match_detail = [
-        date,           # date
-        ht,             # opponent
-        at_result,      # result (w/l/d)
-        f"{asc}-{hsc}"  # score
-    ]
-    
-    # Track previous streak values to detect changes
-    ht_prev_without_win = teams[ht]["games_without_win"]
-    ht_prev_without_loss = teams[ht]["games_without_loss"]
-    at_prev_without_win = teams[at]["games_without_win"]
-    at_prev_without_loss = teams[at]["games_without_loss"]
-
-    # Update home team stats based on match result
-    if hsc > asc:  # Home team won
-        # Record this win if it's the start of a new win streak
-        teams[ht]["winstreak"] += 1
-        teams[ht]["losestreak"] = 0
-        teams[ht]["games_without_win"] = 0
-        teams[ht]["games_without_loss"] += 1
-        # Store this match as the last win before a potential "without win" streak
-        teams[ht]["last_streak_match"] = ht_match_detail
-        
-    elif hsc < asc:  # Home team lost
-        # Record this loss as the transition point for "games_without_loss"
-        if teams[ht]["games_without_loss"] > 0:
-            teams[ht]["last_streak_match"] = ht_match_detail
-            teams[ht]["match_history"] = []
-        
-        teams[ht]["losestreak"] += 1
-        teams[ht]["winstreak"] = 0
-        teams[ht]["games_without_win"] += 1
-        teams[ht]["games_without_loss"] = 0
-        
-    elif hsc == asc:  # Draw
-        teams[ht]["winstreak"] = 0
-        teams[ht]["losestreak"] = 0
-        teams[ht]["games_without_win"] += 1
-        teams[ht]["games_without_loss"] += 1
-
-    # Always add the current match to match history - it's part of the current streak
-    teams[ht]["match_history"].append(ht_match_detail)
-    
-    # For 'games_without_loss' streak, keep all those matches
-    if teams[ht]["games_without_loss"] > 0:
-        # Ensure we only keep the matches that are part of the current streak
-        teams[ht]["match_history"] = teams[ht]["match_history"][-teams[ht]["games_without_loss"]:]
-    # For 'games_without_win' streak, keep all those matches 
-    elif teams[ht]["games_without_win"] > 0:
-        teams[ht]["match_history"] = teams[ht]["match_history"][-teams[ht]["games_without_win"]:]
-
-    # Update away team stats based on match result
-    if asc > hsc:  # Away team won
-        teams[at]["winstreak"] += 1
-        teams[at]["losestreak"] = 0
-        teams[at]["games_without_win"] = 0
-        teams[at]["games_without_loss"] += 1
-        # Store this match as the last win before a potential "without win" streak
-        teams[at]["last_streak_match"] = at_match_detail
-        
-    elif asc < hsc:  # Away team lost
-        # Record this loss as the transition point for "games_without_loss"
-        if teams[at]["games_without_loss"] > 0:
-            teams[at]["last_streak_match"] = at_match_detail
-            teams[at]["match_history"] = []
-        
-        teams[at]["losestreak"] += 1
-        teams[at]["winstreak"] = 0
-        teams[at]["games_without_win"] += 1
-        teams[at]["games_without_loss"] = 0
-        
-    elif asc == hsc:  # Draw
-        teams[at]["winstreak"] = 0
-        teams[at]["losestreak"] = 0
-        teams[at]["games_without_win"] += 1
-        teams[at]["games_without_loss"] += 1
-    
-    # Always add the current match to match history - it's part of the current streak
-    teams[at]["match_history"].append(at_match_detail)
-    
-    # For 'games_without_loss' streak, keep all those matches
-    if teams[at]["games_without_loss"] > 0:
-        # Ensure we only keep the matches that are part of the current streak
-        teams[at]["match_history"] = teams[at]["match_history"][-teams[at]["games_without_loss"]:]
-    # For 'games_without_win' streak, keep all those matches
-    elif teams[at]["games_without_win"] > 0:
-        teams[at]["match_history"] = teams[at]["match_history"][-teams[at]["games_without_win"]:]
-
-def rebuild_statistics():
-    """Rebuild team statistics from saved match data files"""
-    # Reset teams data
-    teams = {}
-    processed_matches = set()
-    
-    # Get all available dates
+def save_match_data(date, matches):
+    """Write a date's (home_team, away_team, home_score, away_score) tuples to its text file"""
+    file_path = os.path.join(OUTPUT_DIR, f"scores_{date}.txt")
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('\n\n'.join(f"{ht}, {hsc}\n{at}, {asc}" for ht, at, hsc, asc in matches))
+
+def get_file_stamp(path):
+    """Return a cheap fingerprint (size and mtime) of a file"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def get_match_file_stamp(date):
+    """Return the stamp of a date's match file"""
+    return get_file_stamp(os.path.join(OUTPUT_DIR, f"scores_{date}.txt"))
+
+def load_match_file_stamps():
+    """Load the {date: stamp} of every match file as it was last read into the archive"""
+    try:
+        with open(MATCH_FILE_STAMPS, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def process_match(match, teams, processed_matches, date, event_id=None):
+    """Process a single (home_id, away_id, home_score, away_score) match; returns False for a duplicate"""
+    ht, at, hsc, asc = match
+    return apply_match(teams, processed_matches, date, ht, at, hsc, asc, match_id=event_id)
+
+def read_match_file(date, metrics):
+    """Reader: parse a date's match file, timed as the "read" stage"""
+    with metrics.stage("read", date):
+        return load_match_data(date)
+
+def iter_match_files(dates, readers=READERS, prefetch=PREFETCH_DATES, metrics=None):
+    """Yield (date, matches) in date order while reader threads parse the dates that follow
+
+    At most `prefetch` dates are parsed ahead of the consumer, so memory stays
+    bounded however many files there are. Time the consumer spends blocked on
+    a reader is the "wait" stage.
+    """
+    if metrics is None:
+        metrics = RunMetrics("read")
+    dates = iter(dates)
+    with ThreadPoolExecutor(max_workers=readers) as executor:
+        pending = deque()
+        for date in dates:
+            pending.append((date, executor.submit(read_match_file, date, metrics)))
+            if len(pending) >= prefetch:
+                break
+        while pending:
+            date, future = pending.popleft()
+            with metrics.stage("wait"):
+                matches = future.result()
+            # Keep the readers one consumed date ahead
+            next_date = next(dates, None)
+            if next_date is not None:
+                pending.append((next_date, executor.submit(read_match_file, next_date, metrics)))
+            metrics.count("files_read")
+            metrics.count("rows_read", len(matches))
+            yield date, matches
+
+def convert_match_files(archive_file=ARCHIVE_FILE, readers=READERS, metrics=None):
+    """Convert the scores_YYYY-MM-DD.txt files into a columnar match archive
+
+    The text files are the tracked record of every saved match; the archive
+    is rebuilt from them when it is missing. They carry no event ids or
+    leagues, so those are lost for the converted rows. Files are read and parsed by `readers` threads while this thread appends
+    the rows to the archive in date order.
+    """
+    if metrics is None:
+        metrics = RunMetrics("convert")
+    metrics.track_throughput("read", "rows_read")
+    metrics.track_throughput("build", "rows_read")
     dates = get_available_dates()
+    # Stamped before reading, so a file edited meanwhile is read again by sync_match_files()
+    stamps = {date: get_match_file_stamp(date) for date in dates}
+    archive = MatchArchive(archive_file)
+    for date, matches in iter_match_files(dates, readers, metrics=metrics):
+        with metrics.stage("build", date):
+            archive.set_matches(date, matches)
+    with metrics.stage("build"):
+        archive.save()
+        if archive_file == ARCHIVE_FILE:
+            write_json_atomic(MATCH_FILE_STAMPS, stamps)
+    print(f"Converted {len(dates)} match files into {archive_file}")
+    print(f"Pipeline: {metrics.format_throughput()}, waited {metrics.stage_totals['wait']:.2f}s for readers")
+    return archive.load()
+
+def sync_match_files(archive):
+    """Read scores_*.txt files added or edited since they were last read into the archive
+
+    A file whose size or mtime differs from its recorded stamp is parsed and,
+    if its matches differ from the archive's rows for that date, replaces
+    them; rows that are still present keep their event ids and leagues.
+    Dates without a text file are left as they are. Returns the changed dates.
+    """
+    stamps = load_match_file_stamps()
+    changed_dates = []
+    stamps_changed = False
+    for date in get_available_dates():
+        stamp = get_match_file_stamp(date)
+        if stamps.get(date) == stamp:
+            continue
+        stamps[date] = stamp
+        stamps_changed = True
+        matches = load_match_data(date)
+        current = archive.get_matches(date)
+        if matches == current:
+            # Written by the scraper from the archive's own rows
+            continue
+
+        saved = {}
+        for match, event_id, league in zip(current, archive.get_event_ids(date), archive.get_leagues(date)):
+            saved.setdefault(match, deque()).append((event_id, league))
+        kept = [saved[match].popleft() if saved.get(match) else (None, None) for match in matches]
+        archive.set_matches(date, matches, [event_id for event_id, _ in kept], [league for _, league in kept])
+        changed_dates.append(date)
+
+    if changed_dates:
+        archive.save()
+        print(f"Imported {len(changed_dates)} new or edited match files into {archive.path}")
+    if stamps_changed:
+        write_json_atomic(MATCH_FILE_STAMPS, stamps)
+    return changed_dates
+
+def load_match_archive(readers=READERS, metrics=None):
+    """Load the match archive, converting the text files on first use and importing any added or edited since"""
+    archive = MatchArchive(ARCHIVE_FILE)
+    if not archive.exists():
+        return convert_match_files(readers=readers, metrics=metrics)
+    archive.load()
+    sync_match_files(archive)
+    return archive
+
+def get_checkpoint_path(date):
+    """Return the checkpoint file path for a date"""
+    return os.path.join(CHECKPOINT_DIR, f"checkpoint_{date}.json")
+
+def load_manifest():
+    """Load the checkpoint manifest (applied date fingerprints and checkpoint dates)"""
+    try:
+        with open(CHECKPOINT_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"fingerprints": {}, "checkpoints": []}
+
+def get_matches_path(date):
+    """Return the file holding a checkpoint's processed match keys"""
+    return os.path.join(CHECKPOINT_DIR, f"checkpoint_{date}.matches")
+
+def save_processed_matches(path, processed_matches):
+    """Write processed match keys as packed arrays: uint64 event ids, then uint32 (home, away, score) keys"""
+    event_ids = array('Q')
+    keys = array('I')
+    for match_id in processed_matches:
+        if isinstance(match_id, tuple):
+            keys.extend(match_id)
+        else:
+            event_ids.append(match_id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MATCHES_HEADER.pack(len(event_ids), len(keys) // 4))
+        f.write(event_ids.tobytes())
+        f.write(keys.tobytes())
+    os.replace(tmp_path, path)
+
+def load_processed_matches(path, team_ids):
+    """Read processed match keys, mapping checkpoint team ids through team_ids"""
+    with open(path, 'rb') as f:
+        event_count, key_count = MATCHES_HEADER.unpack(f.read(MATCHES_HEADER.size))
+        event_ids = array('Q')
+        event_ids.frombytes(f.read(event_count * event_ids.itemsize))
+        keys = array('I')
+        keys.frombytes(f.read(key_count * 4 * keys.itemsize))
+    processed_matches = set(event_ids)
+    for i in range(0, len(keys), 4):
+        processed_matches.add((team_ids[keys[i]], team_ids[keys[i + 1]], keys[i + 2], keys[i + 3]))
+    return processed_matches
+
+def save_checkpoint(date, teams, processed_matches, manifest, registry):
+    """Persist team state after the given date and register it in the manifest"""
+    if not os.path.exists(CHECKPOINT_DIR):
+        os.makedirs(CHECKPOINT_DIR)
+
+    save_processed_matches(get_matches_path(date), processed_matches)
+    # Team ids in the match keys are positions in team_names
+    write_json_atomic(get_checkpoint_path(date), {
+        "last_date": date,
+        "teams": registry.named(teams),
+        "team_names": registry.names
+    }, default=registry.state_to_json)
+
+    checkpoints = [c for c in manifest["checkpoints"] if c != date] + [date]
+    for old_date in checkpoints[:-MAX_CHECKPOINTS]:
+        discard_checkpoint(old_date)
+    manifest["checkpoints"] = checkpoints[-MAX_CHECKPOINTS:]
+
+    # The manifest is written last so it never points at a missing checkpoint
+    write_json_atomic(CHECKPOINT_MANIFEST, manifest)
+
+def load_checkpoint(date, registry):
+    """Load team state and processed match ids from a checkpoint"""
+    with open(get_checkpoint_path(date), 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    teams = registry.load_states(checkpoint["teams"])
+    team_ids = [registry.intern(name) for name in checkpoint["team_names"]]
+    processed_matches = load_processed_matches(get_matches_path(date), team_ids)
+    return teams, processed_matches
+
+def discard_checkpoint(date):
+    """Remove a checkpoint's files if they exist"""
+    for path in (get_checkpoint_path(date), get_matches_path(date)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def find_resume_point(dates, fingerprints, manifest):
+    """Return the latest checkpoint date still valid for the current match files"""
+    applied = manifest["fingerprints"]
+    checkpoints = [c for c in manifest["checkpoints"] if os.path.exists(get_checkpoint_path(c))]
+    changed = [d for d in set(applied) | set(dates) if applied.get(d) != fingerprints.get(d)]
+    if not changed:
+        return max(checkpoints, default=None)
+
+    # Roll back to the latest checkpoint taken before the earliest change
+    first_changed = min(changed)
+    usable = [c for c in checkpoints if c < first_changed]
+    return max(usable, default=None)
+
+def save_changed_teams(archive, dates, teams, changed_teams, registry, team_ids):
+    """Write the teams the replayed dates changed: a journal entry, index upserts and their league shards"""
+    team_store = TeamStore(TEAMS_FILE)
+    team_store.count_journal_entries()
+    # Not marked as processed by a scrape, only brought up to date with the archive
+    team_store.commit(dates[-1], teams, changed_teams, registry, partial=True)
+    team_store.compact_if_needed(teams, registry)
+    update_index(teams, changed_teams, registry)
+
+    league_store = load_league_store()
+    for date in dates:
+        for (home_id, away_id, _, _), league in zip(archive.get_match_rows(date), archive.get_leagues(date)):
+            league_store.add_match(date, registry.names[team_ids[home_id]], registry.names[team_ids[away_id]],
+                                   league)
+    league_store.update(teams, registry, changed_teams)
+
+def rebuild_statistics(incremental=False, workers=1, metrics=None, readers=READERS):
+    """Rebuild team statistics from the match archive
+
+    With workers other than 1 (0 for one per CPU), a rebuild from scratch is
+    replayed in parallel over independent groups of teams. A rebuild from
+    scratch writes only the final checkpoint; incremental runs checkpoint
+    every CHECKPOINT_INTERVAL dates. An incremental run that only adds dates
+    after the last saved one writes just the teams they change; one that
+    rolls back rewrites everything. Stage times and counters are added to
+    metrics, if given. Match files are converted with `readers` threads if
+    the archive does not exist yet.
+    """
+    if metrics is None:
+        metrics = RunMetrics("rebuild")
+    metrics.track_throughput("process", "matches_applied")
+    with metrics.stage("load"):
+        archive = load_match_archive(readers, metrics)
+
+    # Get all available dates
+    dates = archive.get_dates()
     if not dates:
         print("No match data files found")
         return
     
     print(f"Found match data for {len(dates)} dates")
+
+    with metrics.stage("load"):
+        manifest = load_manifest()
+        archive_stamp = get_file_stamp(archive.path)
+        # The stamp is only recorded once a run has saved every date, so an
+        # unchanged archive means there is nothing to replay or write
+        saved = (incremental and manifest.get("archive_stamp") is not None
+                 and os.path.exists(TEAMS_FILE) and os.path.exists(LEAGUES_FILE))
+        if saved and manifest["archive_stamp"] == archive_stamp:
+            print("Statistics already up to date")
+            return
+        fingerprints = archive.get_fingerprints()
+        resume_date = find_resume_point(dates, fingerprints, manifest) if incremental else None
+
+    # Only dates after the last one saved are replayed: the saved team state
+    # is current apart from the teams those dates touch
+    appending = saved and resume_date is not None and resume_date == max(manifest["fingerprints"], default=None)
+    if appending and resume_date == dates[-1]:
+        print("Statistics already up to date")
+        manifest["archive_stamp"] = archive_stamp
+        write_json_atomic(CHECKPOINT_MANIFEST, manifest)
+        return
+
+    registry = load_registry()
+    if resume_date:
+        print(f"Resuming from checkpoint {resume_date}")
+        with metrics.stage("load"):
+            teams, processed_matches = load_checkpoint(resume_date, registry)
+    else:
+        # Reset teams data
+        teams = {}
+        processed_matches = set()
+
+    # Forget everything applied after the resume point
+    for checkpoint_date in manifest["checkpoints"]:
+        if resume_date is None or checkpoint_date > resume_date:
+            discard_checkpoint(checkpoint_date)
+    manifest = {
+        "fingerprints": {d: fp for d, fp in manifest["fingerprints"].items()
+                         if resume_date is not None and d <= resume_date},
+        "checkpoints": [c for c in manifest["checkpoints"]
+                        if resume_date is not None and c <= resume_date]
+    }
+
+    pending_dates = [date for date in dates if resume_date is None or date > resume_date]
+    if not pending_dates:
+        print("Statistics already up to date")
+
+    if workers != 1 and resume_date is None:
+        with metrics.stage("process"):
+            teams, processed_matches = rebuild_parallel(archive, registry, workers)
+        metrics.count("matches_applied", len(processed_matches))
+        metrics.count("matches_deduplicated", len(archive.days) - len(processed_matches))
+        metrics.count("teams_created", len(teams))
+        metrics.count("dates_processed", len(dates))
+        manifest["fingerprints"] = dict(fingerprints)
+        with metrics.stage("checkpoint"):
+            save_checkpoint(dates[-1], teams, processed_matches, manifest, registry)
+        pending_dates = []
     
+    # Archive team ids to registry ids; aliases of one team share an id
+    team_ids = [registry.intern(name) for name in archive.names]
+
     # Process matches in chronological order
-    for date in sorted(dates):
+    changed_teams = set()
+    for idx, date in enumerate(pending_dates, 1):
         print(f"Processing data for {date}...")
-        matches = load_match_data(date)
-        
-        for match in matches:
-            process_match(match, teams, processed_matches, date)
+        with metrics.stage("process", date):
+            matches = archive.get_match_rows(date)
+            team_count = len(teams)
+            applied = 0
+            for (home_id, away_id, hsc, asc), event_id in zip(matches, archive.get_event_ids(date)):
+                match = (team_ids[home_id], team_ids[away_id], hsc, asc)
+                applied += process_match(match, teams, processed_matches, date, event_id)
+                changed_teams.update(match[:2])
+        metrics.count("matches_applied", applied)
+        metrics.count("matches_deduplicated", len(matches) - applied)
+        metrics.count("teams_created", len(teams) - team_count)
+        metrics.count("dates_processed")
+
+        manifest["fingerprints"][date] = fingerprints[date]
+        if (incremental and idx % CHECKPOINT_INTERVAL == 0) or idx == len(pending_dates):
+            with metrics.stage("checkpoint", date):
+                save_checkpoint(date, teams, processed_matches, manifest, registry)
+        metrics.end_date(date)
     
-    # Save updated team statistics
     try:
-        with open("teams.json", 'w', encoding='utf-8') as f:
-            json.dump(teams, f, indent=4, ensure_ascii=False)
-        print("Team statistics rebuilt and saved to teams.json")
+        with metrics.stage("save"):
+            if appending:
+                save_changed_teams(archive, pending_dates, teams, changed_teams, registry, team_ids)
+            else:
+                # Save updated team statistics, discarding any stale journal
+                TeamStore(TEAMS_FILE).compact(teams, registry)
+                build_index(teams, registry)
+                LeagueStore().rebuild(archive, teams, registry)
+            manifest["archive_stamp"] = archive_stamp
+            write_json_atomic(CHECKPOINT_MANIFEST, manifest)
+        print(f"Team statistics rebuilt and saved to {TEAMS_FILE}")
     except Exception as e:
-        print(f"Error saving teams.json: {e}")
+        print(f"Error saving team statistics: {e}")
+    print(f"Throughput: {metrics.format_throughput()}")
     
     return teams
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild team statistics from saved match data")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Replay only dates added or changed since the last checkpoint")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for a full rebuild (0 = one per CPU); falls back to a "
+                             "serial replay when most matches belong to one connected group of teams")
+    parser.add_argument("--convert", action="store_true",
+                        help=f"Convert {OUTPUT_DIR}/scores_*.txt files into {ARCHIVE_FILE} and exit")
+    parser.add_argument("--readers", type=int, default=READERS,
+                        help="Threads reading and parsing match files ahead of the conversion")
+    add_profiling_arguments(parser)
+    
+    args = parser.parse_args()
+
+    if args.workers < 0:
+        print("--workers must be 0 or more")
+        return
+    if args.readers < 1:
+        print("--readers must be at least 1")
+        return
+    if args.convert:
+        convert_match_files(readers=args.readers)
+        return
+
+    metrics = RunMetrics("rebuild")
+    metrics.start_profiling(args.profile, args.trace_memory)
     print("Rebuilding team statistics from saved match data...")
-    rebuild_statistics()
+    rebuild_statistics(incremental=args.incremental, workers=args.workers, metrics=metrics, readers=args.readers)
+    metrics.write_summary()
     print("Done!")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,221 @@
+import atexit
+import json
 import os
+import queue
+import threading
 from datetime import datetime
 
+from atomic_file import write_json_atomic
+
+DEFAULT_BUFFER_SIZE = 200   # Entries held in memory before a flush
+
 class MatchLogger:
     """Class to handle logging of match processing information"""
-    
-    def __init__(self, log_file="skipped_matches.log"):
-        """Initialize the logger with a file path"""
+
+    def __init__(self, log_file="skipped_matches.log", buffer_size=DEFAULT_BUFFER_SIZE,
+                 flush_interval=None, background=False, json_lines=False):
+        """Initialize the logger with a file path and buffering options
+
+        Entries are buffered and written in batches once buffer_size is
+        reached, every flush_interval seconds (if set), and on close().
+        With background=True batches are written by a worker thread. With
+        json_lines=True each entry is a JSON object and a date/team index of
+        line offsets is kept in "<log_file>.idx" for later queries. Each batch
+        appends only its own offsets to "<log_file>.idx.log"; those deltas are
+        merged into "<log_file>.idx" on close().
+        """
         self.log_file_path = log_file
+        self.index_path = f"{log_file}.idx"
+        self.index_log_path = f"{log_file}.idx.log"
+        self.buffer_size = max(1, buffer_size)
+        self.json_lines = json_lines
         self._ensure_log_directory()
-    
+
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._index = self._load_index() if json_lines else None
+
+        self._queue = None
+        self._writer = None
+        if background:
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(target=self._write_worker, daemon=True)
+            self._writer.start()
+
+        self._stop_timer = threading.Event()
+        self._timer = None
+        if flush_interval:
+            self._timer = threading.Thread(target=self._flush_periodically, args=(flush_interval,), daemon=True)
+            self._timer.start()
+
+        atexit.register(self.close)
+
     def _ensure_log_directory(self):
         """Create the log directory if it doesn't exist"""
         log_dir = os.path.dirname(self.log_file_path)
         if log_dir and not os.path.exists(log_dir):
             os.makedirs(log_dir)
-    
-    def log_skipped_match(self, date, home_team, away_team, reason="unplayed/postponed"):
-        """Log information about a skipped match"""
+
+    def _load_index(self):
+        """Load the date/team offset index for a JSON-lines log, replaying any uncompacted deltas"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            index = {"dates": {}, "teams": {}}
+        index.setdefault("end", 0)
+
+        try:
+            with open(self.index_log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        delta = json.loads(line)
+                    except ValueError:
+                        break   # Torn last line from an interrupted write
+                    # Deltas already merged by a compaction that was cut short are skipped
+                    if delta["end"] > index["end"]:
+                        self._merge_index(index, delta)
+        except FileNotFoundError:
+            pass
+        return index
+
+    @staticmethod
+    def _merge_index(index, delta):
+        """Add the offsets of an index delta to the index"""
+        for key in ("dates", "teams"):
+            for name, offsets in delta[key].items():
+                index[key].setdefault(name, []).extend(offsets)
+        index["end"] = delta["end"]
+
+    def _compact_index(self):
+        """Write the full index and drop the delta file it now covers"""
+        with self._write_lock:
+            if not os.path.exists(self.index_log_path):
+                return
+            write_json_atomic(self.index_path, self._index)
+            os.remove(self.index_log_path)
+
+    def log_skipped_match(self, date, home_team, away_team, reason="unplayed/postponed", **details):
+        """Log information about a skipped match; extra details are kept in JSON-lines mode"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] Date: {date} - {home_team} vs {away_team} - Reason: {reason}\n"
-        
-        with open(self.log_file_path, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        entry = {
+            "timestamp": timestamp,
+            "date": date,
+            "home_team": home_team,
+            "away_team": away_team,
+            "reason": reason,
+            **details
+        }
+
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write out all buffered entries"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        if self._queue is not None:
+            self._queue.put(batch)
+        else:
+            self._write_batch(batch)
+
+    def _format_entry(self, entry):
+        """Return the log line for an entry"""
+        if self.json_lines:
+            return json.dumps(entry, ensure_ascii=False) + "\n"
+        return (f"[{entry['timestamp']}] Date: {entry['date']} - {entry['home_team']} vs "
+                f"{entry['away_team']} - Reason: {entry['reason']}\n")
+
+    def _write_batch(self, batch):
+        """Append a batch of entries with a single open/write"""
+        with self._write_lock:
+            with open(self.log_file_path, 'ab') as f:
+                offset = f.tell()
+                chunks = []
+                delta = {"dates": {}, "teams": {}}
+                for entry in batch:
+                    line = self._format_entry(entry).encode('utf-8')
+                    if self._index is not None:
+                        delta["dates"].setdefault(entry["date"], []).append(offset)
+                        for team in (entry["home_team"], entry["away_team"]):
+                            delta["teams"].setdefault(team, []).append(offset)
+                    chunks.append(line)
+                    offset += len(line)
+                f.write(b"".join(chunks))
+
+            if self._index is not None:
+                delta["end"] = offset
+                with open(self.index_log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(delta, ensure_ascii=False) + "\n")
+                self._merge_index(self._index, delta)
+
+    def _write_worker(self):
+        """Background thread that writes queued batches until it receives None"""
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                self._queue.task_done()
+                break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"Error writing {self.log_file_path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _flush_periodically(self, interval):
+        """Timer thread that flushes the buffer every interval seconds"""
+        while not self._stop_timer.wait(interval):
+            self.flush()
+
+    def find_skipped(self, date=None, team=None):
+        """Return logged entries for a date and/or team using the JSON-lines index"""
+        if self._index is None:
+            raise ValueError("find_skipped() requires a logger created with json_lines=True")
+        self.flush()
+        if self._queue is not None:
+            # Wait for the background writer to catch up
+            self._queue.join()
+
+        with self._write_lock:
+            offsets = None
+            if date is not None:
+                offsets = set(self._index["dates"].get(date, []))
+            if team is not None:
+                team_offsets = set(self._index["teams"].get(team, []))
+                offsets = team_offsets if offsets is None else offsets & team_offsets
+            if offsets is None:
+                offsets = {o for values in self._index["dates"].values() for o in values}
+
+            entries = []
+            if not offsets:
+                return entries
+            with open(self.log_file_path, 'rb') as f:
+                for offset in sorted(offsets):
+                    f.seek(offset)
+                    entries.append(json.loads(f.readline()))
+            return entries
+
+    def close(self):
+        """Flush remaining entries and stop the timer and writer threads"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop_timer.set()
+        self.flush()
+        if self._queue is not None:
+            self._queue.put(None)
+            self._writer.join()
+        if self._index is not None:
+            self._compact_index()
 
-def get_logger(log_file="skipped_matches.log"):
+def get_logger(log_file="skipped_matches.log", **options):
     """Factory function to create a logger instance"""
-    return MatchLogger(log_file)
+    return MatchLogger(log_file, **options)
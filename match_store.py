@@ -0,0 +1,257 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_right
+from datetime import date as Date
+
+ARCHIVE_FILE = os.path.join("match_stats", "matches.bin")
+
+# File layout: header, then one column per field, then the name tables.
+#   event_ids  uint64 x rows  (API event id, 0 when unknown; version 2+)
+#   home_ids   uint32 x rows
+#   away_ids   uint32 x rows
+#   days       uint16 x rows  (days since EPOCH, rows sorted by day)
+#   home_goals uint8  x rows
+#   away_goals uint8  x rows
+#   league_ids uint16 x rows  (index into leagues, 0 when unknown; version 3+)
+#   names      UTF-8 JSON {"teams": [...], "leagues": [[country, tournament], ...]}
+#              (versions 1 and 2: the team list alone)
+MAGIC = b"FSMA"
+VERSION = 3
+HEADER = struct.Struct("<4sHHII")  # magic, version, reserved, row count, names size
+COLUMNS = (("event_ids", 'Q'), ("home_ids", 'I'), ("away_ids", 'I'),
+           ("days", 'H'), ("home_goals", 'B'), ("away_goals", 'B'), ("league_ids", 'H'))
+# Columns added after version 1, with the version that introduced them
+ADDED_COLUMNS = {"event_ids": 2, "league_ids": 3}
+EPOCH = Date(2000, 1, 1).toordinal()
+
+def date_to_day(date):
+    """Convert a YYYY-MM-DD string to a day offset"""
+    return Date.fromisoformat(date).toordinal() - EPOCH
+
+def day_to_date(day):
+    """Convert a day offset back to a YYYY-MM-DD string"""
+    return Date.fromordinal(day + EPOCH).isoformat()
+
+class MatchArchive:
+    """Columnar store of every saved match with interned team ids"""
+
+    def __init__(self, path=ARCHIVE_FILE):
+        """Initialize an empty archive bound to a file path"""
+        self.path = path
+        self.names = []
+        self._name_ids = {}
+        self.leagues = [None]
+        self._league_ids = {}
+        self._mmap = None
+        self._view = None
+        self._set_columns([array(fmt) for _, fmt in COLUMNS])
+
+    def _columns(self):
+        """Return the column arrays (or views) in file order"""
+        return [getattr(self, name) for name, _ in COLUMNS]
+
+    def _set_columns(self, columns):
+        """Replace the column views and rebuild the per-date row index"""
+        for (name, _), column in zip(COLUMNS, columns):
+            setattr(self, name, column)
+
+        # Rows are sorted by day, so each date is one contiguous slice
+        days = self.days
+        self._date_ranges = {}
+        start = 0
+        for idx in range(1, len(days) + 1):
+            if idx == len(days) or days[idx] != days[start]:
+                self._date_ranges[day_to_date(days[start])] = (start, idx)
+                start = idx
+
+    def exists(self):
+        """Return True if the archive file is present on disk"""
+        return os.path.exists(self.path)
+
+    def load(self):
+        """Memory-map the archive file; columns are views into the mapping"""
+        self.close()
+        if not self.exists():
+            return self
+
+        with open(self.path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, rows, names_size = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or not 1 <= version <= VERSION:
+            mapped.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} match archive")
+
+        view = memoryview(mapped)
+        offset = HEADER.size
+        columns = []
+        for name, fmt in COLUMNS:
+            width = array(fmt).itemsize
+            if version < ADDED_COLUMNS.get(name, 1):
+                # Older archives predate this column
+                columns.append(array(fmt, bytes(rows * width)))
+                continue
+            columns.append(view[offset:offset + rows * width].cast(fmt))
+            offset += rows * width
+        names = json.loads(bytes(view[offset:offset + names_size]).decode('utf-8'))
+        if version < 3:
+            names = {"teams": names, "leagues": [None]}
+        self.names = names["teams"]
+        self._name_ids = {name: team_id for team_id, name in enumerate(self.names)}
+        self.leagues = [tuple(league) if league else None for league in names["leagues"]]
+        self._league_ids = {league: league_id for league_id, league in enumerate(self.leagues) if league}
+
+        self._mmap = mapped
+        self._view = view
+        self._set_columns(columns)
+        return self
+
+    def close(self):
+        """Release the memory mapping, if any"""
+        if self._mmap is None:
+            return
+        for column in self._columns():
+            if isinstance(column, memoryview):
+                column.release()
+        self._view.release()
+        self._mmap.close()
+        self._mmap = None
+        self._view = None
+
+    def _materialize(self):
+        """Copy mapped columns into writable arrays before modifying them"""
+        if self._mmap is None:
+            return
+        columns = [array(fmt, column) for (_, fmt), column in zip(COLUMNS, self._columns())]
+        self.close()
+        self._set_columns(columns)
+
+    def intern(self, name):
+        """Return the team id for a name, assigning a new one if needed"""
+        team_id = self._name_ids.get(name)
+        if team_id is None:
+            team_id = len(self.names)
+            self.names.append(name)
+            self._name_ids[name] = team_id
+        return team_id
+
+    def intern_league(self, league):
+        """Return the league id for a (country, tournament) pair, assigning a new one if needed; 0 for None"""
+        if not league:
+            return 0
+        league = tuple(league)
+        league_id = self._league_ids.get(league)
+        if league_id is None:
+            league_id = len(self.leagues)
+            self.leagues.append(league)
+            self._league_ids[league] = league_id
+        return league_id
+
+    def get_dates(self):
+        """Return the sorted list of dates held in the archive"""
+        return list(self._date_ranges)
+
+    def get_matches(self, date):
+        """Return (home_team, away_team, home_score, away_score) tuples for a date"""
+        start, end = self._date_ranges.get(date, (0, 0))
+        names = self.names
+        return list(zip(
+            [names[i] for i in self.home_ids[start:end]],
+            [names[i] for i in self.away_ids[start:end]],
+            self.home_goals[start:end],
+            self.away_goals[start:end]
+        ))
+
+    def get_match_rows(self, date):
+        """Return (home_id, away_id, home_score, away_score) tuples for a date, using archive team ids"""
+        start, end = self._date_ranges.get(date, (0, 0))
+        return list(zip(self.home_ids[start:end], self.away_ids[start:end],
+                        self.home_goals[start:end], self.away_goals[start:end]))
+
+    def get_event_ids(self, date):
+        """Return the API event id of each match on a date (None when unknown)"""
+        start, end = self._date_ranges.get(date, (0, 0))
+        return [event_id or None for event_id in self.event_ids[start:end]]
+
+    def get_leagues(self, date):
+        """Return the (country, tournament) of each match on a date (None when unknown)"""
+        start, end = self._date_ranges.get(date, (0, 0))
+        return [self.leagues[league_id] for league_id in self.league_ids[start:end]]
+
+    def get_fingerprints(self):
+        """Return {date: checksum of the date's rows} for every date
+
+        Team names are covered by a running checksum of the name table up to
+        the highest team id the date uses: names are only ever appended, so
+        a renamed team changes it for every date that could refer to it.
+        """
+        name_checksums = []
+        checksum = 0
+        for name in self.names:
+            checksum = zlib.crc32(name.encode('utf-8'), checksum)
+            name_checksums.append(checksum)
+
+        fingerprints = {}
+        for date, (start, end) in self._date_ranges.items():
+            checksum = name_checksums[max(max(self.home_ids[start:end]), max(self.away_ids[start:end]))]
+            for column in (self.event_ids, self.home_ids, self.away_ids, self.home_goals, self.away_goals):
+                checksum = zlib.crc32(column[start:end].tobytes(), checksum)
+            fingerprints[date] = f"{end - start}:{checksum:08x}"
+        return fingerprints
+
+    def set_matches(self, date, matches, event_ids=None, leagues=None):
+        """Replace all rows for a date with (home_team, away_team, home_score, away_score) tuples
+
+        event_ids and leagues ((country, tournament) pairs) are optional and
+        parallel to matches.
+        """
+        self._materialize()
+        day = date_to_day(date)
+        start, end = self._date_ranges.get(date, (None, None))
+        if start is None:
+            # Insert the new date at its sorted position
+            start = end = bisect_right(self.days, day)
+        if event_ids is None:
+            event_ids = [None] * len(matches)
+        if leagues is None:
+            leagues = [None] * len(matches)
+
+        new_rows = (
+            array('Q', [event_id or 0 for event_id in event_ids]),
+            array('I', [self.intern(m[0]) for m in matches]),
+            array('I', [self.intern(m[1]) for m in matches]),
+            array('H', [day] * len(matches)),
+            array('B', [m[2] for m in matches]),
+            array('B', [m[3] for m in matches]),
+            array('H', [self.intern_league(league) for league in leagues])
+        )
+        if start == len(self.days) and end == start:
+            # A date after every saved one (the usual case while converting
+            # or scraping) is appended in place, without re-indexing all rows
+            for column, new in zip(self._columns(), new_rows):
+                column.extend(new)
+            if matches:
+                self._date_ranges[date] = (start, start + len(matches))
+            return
+        self._set_columns([column[:start] + new + column[end:]
+                           for column, new in zip(self._columns(), new_rows)])
+
+    def save(self):
+        """Write the archive to a temporary file and move it into place"""
+        self._materialize()
+        names = json.dumps({"teams": self.names, "leagues": self.leagues}, ensure_ascii=False).encode('utf-8')
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(self.days), len(names)))
+            for column in self._columns():
+                f.write(column.tobytes())
+            f.write(names)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,123 @@
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from match_store import MatchArchive, day_to_date
+from streak_engine import apply_match
+from team_registry import TeamRegistry
+
+MAX_PARTITION_SHARE = 0.75   # Replay serially when one partition would hold more of the rows than this
+
+def find_components(home_ids, away_ids, team_count):
+    """Union-find over fixtures; return the component root of every team id"""
+    parent = array('I', range(team_count))
+
+    def find(team_id):
+        while parent[team_id] != team_id:
+            # Path halving keeps the trees shallow
+            parent[team_id] = parent[parent[team_id]]
+            team_id = parent[team_id]
+        return team_id
+
+    for home_id, away_id in zip(home_ids, away_ids):
+        home_root, away_root = find(home_id), find(away_id)
+        if home_root != away_root:
+            parent[max(home_root, away_root)] = min(home_root, away_root)
+
+    return array('I', (find(team_id) for team_id in range(team_count)))
+
+def get_team_ids(registry, archive):
+    """Intern the archive's team names in order; return the registry id of each archive team id
+
+    Workers intern into a fresh registry the same way, so ids agree across processes.
+    """
+    return array('I', (registry.intern(name) for name in archive.names))
+
+def select_rows(archive, team_ids):
+    """Return the rows the serial replay would apply, plus the keys they were deduplicated on
+
+    Duplicates are dropped here, before partitioning, so each worker can
+    replay its rows without sharing a processed-matches set.
+    """
+    seen = set()
+    rows = array('I')
+    columns = zip(archive.event_ids, archive.home_ids, archive.away_ids, archive.home_goals, archive.away_goals)
+    for row, (event_id, home_id, away_id, home_goals, away_goals) in enumerate(columns):
+        key = event_id or (team_ids[home_id], team_ids[away_id], home_goals, away_goals)
+        if key in seen:
+            continue
+        seen.add(key)
+        rows.append(row)
+    return rows, seen
+
+def partition_rows(archive, team_ids, rows, partitions):
+    """Split rows into at most `partitions` lists, keeping each team component in one list"""
+    home_ids = [team_ids[team_id] for team_id in archive.home_ids]
+    away_ids = [team_ids[team_id] for team_id in archive.away_ids]
+    components = find_components(home_ids, away_ids, max(team_ids, default=-1) + 1)
+    by_component = {}
+    for row in rows:
+        by_component.setdefault(components[home_ids[row]], array('I')).append(row)
+
+    # Largest components first, each into the currently lightest partition
+    bins = [array('I') for _ in range(partitions)]
+    for component_rows in sorted(by_component.values(), key=len, reverse=True):
+        min(bins, key=len).extend(component_rows)
+    # Rows were appended component by component; restore chronological order
+    return [array('I', sorted(bin_rows)) for bin_rows in bins if bin_rows]
+
+def replay_partition(archive_path, aliases, rows):
+    """Worker: replay the given archive rows in order and return the resulting team states"""
+    archive = MatchArchive(archive_path).load()
+    team_ids = get_team_ids(TeamRegistry(aliases), archive)
+    dates = {}
+    teams = {}
+    for row in rows:
+        day = archive.days[row]
+        date = dates.get(day)
+        if date is None:
+            date = dates[day] = day_to_date(day)
+        # Rows were deduplicated up front, so every row is applied
+        apply_match(teams, set(), date, team_ids[archive.home_ids[row]], team_ids[archive.away_ids[row]],
+                    archive.home_goals[row], archive.away_goals[row])
+    archive.close()
+    return teams
+
+def rebuild_parallel(archive, registry, workers=None):
+    """Replay the whole archive across worker processes; return (teams, processed_matches)
+
+    registry must be empty, so that its ids match the ones the workers assign.
+    The result is identical to replaying every row serially through
+    apply_match: teams only ever change when they play, so components of the
+    team graph are independent, and the merged dict is rebuilt in the order
+    teams first appear in the archive. When the largest partition holds
+    more than MAX_PARTITION_SHARE of the rows, they are replayed in this
+    process instead.
+    """
+    if registry.names:
+        raise ValueError("rebuild_parallel() needs an empty team registry")
+    workers = workers or os.cpu_count() or 1
+    team_ids = get_team_ids(registry, archive)
+    rows, processed_matches = select_rows(archive, team_ids)
+    partitions = partition_rows(archive, team_ids, rows, workers)
+
+    if len(partitions) < 2 or max(map(len, partitions)) > len(rows) * MAX_PARTITION_SHARE:
+        # One component dominates (as in a connected league system); worker
+        # start-up and merging would cost more than they save
+        print(f"Replaying {len(rows)} matches serially, the largest partition holds "
+              f"{max(map(len, partitions), default=0)} of them")
+        partial = replay_partition(archive.path, registry.aliases, rows)
+    else:
+        print(f"Replaying {len(rows)} matches in {len(partitions)} partitions")
+        partial = {}
+        with ProcessPoolExecutor(max_workers=len(partitions)) as executor:
+            for teams in executor.map(replay_partition, [archive.path] * len(partitions),
+                                      [registry.aliases] * len(partitions), partitions):
+                partial.update(teams)
+
+    teams = {}
+    for row in rows:
+        for team_id in (team_ids[archive.home_ids[row]], team_ids[archive.away_ids[row]]):
+            if team_id not in teams:
+                teams[team_id] = partial[team_id]
+    return teams, processed_matches
@@ -0,0 +1,135 @@
+import json
+import os
+from datetime import datetime, timedelta
+from atomic_file import write_json_atomic
+from event_index import EVENT_INDEX_FILE, EventIndex
+from fetcher import DateFetcher
+from load_from_files import convert_match_files, rebuild_statistics, save_match_data
+from response_cache import CACHE_DIR, ResponseCache
+from scrape import BASE_URL, HEADERS, MAX_WORKERS, REQUESTS_PER_SECOND, SKIPPED_MATCHES_LOG, match_archive
+
+PENDING_FILE = "pending_fixtures.json"
+MAX_PENDING_DAYS = 60   # Fixtures still unplayed after this long are dropped
+DROPPED_STATUSES = {"canceled", "abandoned"}
+
+def load_pending():
+    """Load the pending-fixtures index and how far into the skipped-match log it has read"""
+    try:
+        with open(PENDING_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"log_offset": 0, "dates": {}}
+
+def save_pending(pending):
+    """Write the pending-fixtures index to a temporary file and move it into place"""
+    write_json_atomic(PENDING_FILE, pending, indent=4)
+
+def get_fixture_key(event_id, home_team, away_team):
+    """Identify a fixture by its event id, or by its teams for entries logged without one"""
+    return f"id:{event_id}" if event_id is not None else f"teams:{home_team}|{away_team}"
+
+def update_pending(pending, log_file=SKIPPED_MATCHES_LOG):
+    """Add fixtures logged since the last update and drop ones that are too old"""
+    if os.path.exists(log_file):
+        with open(log_file, 'rb') as f:
+            if os.path.getsize(log_file) < pending["log_offset"]:
+                # The log was replaced; read it again from the start
+                pending["log_offset"] = 0
+            f.seek(pending["log_offset"])
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                pending["log_offset"] += len(line)
+                entry = json.loads(line)
+                key = get_fixture_key(entry.get("event_id"), entry["home_team"], entry["away_team"])
+                pending["dates"].setdefault(entry["date"], {})[key] = {
+                    "home_team": entry["home_team"],
+                    "away_team": entry["away_team"]
+                }
+
+    cutoff = (datetime.now() - timedelta(days=MAX_PENDING_DAYS)).strftime("%Y-%m-%d")
+    for date in [d for d in pending["dates"] if d < cutoff or not pending["dates"][d]]:
+        del pending["dates"][date]
+
+def resolve_fixtures(date, events, fixtures):
+    """Return (home_team, away_team, home_score, away_score, event_id, (country, tournament)) for pending fixtures that now have results"""
+    results = []
+    seen = set()
+    for event in events:
+        key = get_fixture_key(event.event_id, event.home_team, event.away_team)
+        if key not in fixtures:
+            key = get_fixture_key(None, event.home_team, event.away_team)
+            if key not in fixtures:
+                continue
+        seen.add(key)
+
+        if event.home_score is not None and event.away_score is not None:
+            results.append((event.home_team, event.away_team, event.home_score, event.away_score, event.event_id,
+                            (event.country, event.tournament)))
+            del fixtures[key]
+        elif event.status in DROPPED_STATUSES:
+            del fixtures[key]
+
+    # Fixtures no longer listed on this date were rescheduled; the regular
+    # scrape picks them up on their new date
+    if events:
+        for key in [k for k in fixtures if k not in seen]:
+            del fixtures[key]
+    return results
+
+def reconcile():
+    """Re-fetch dates with pending fixtures and replay any late results in date order"""
+    pending = load_pending()
+    update_pending(pending)
+    if not pending["dates"]:
+        print("No pending fixtures")
+        save_pending(pending)
+        return
+
+    if not match_archive.exists():
+        convert_match_files()
+    match_archive.load()
+
+    # Pending dates are cached as unfinished, so always ask the API for fresh results
+    fetcher = DateFetcher(BASE_URL, HEADERS, max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND,
+                          cache=ResponseCache(CACHE_DIR), refresh=True)
+    dates = sorted(pending["dates"])
+    print(f"Re-fetching {len(dates)} dates with pending fixtures...")
+    processed_events = EventIndex(EVENT_INDEX_FILE).load()
+    changed_dates = []
+    for date, events in fetcher.fetch_in_order(dates):
+        results = resolve_fixtures(date, events, pending["dates"][date])
+        matches = match_archive.get_matches(date)
+        event_ids = match_archive.get_event_ids(date)
+        known = set(matches) | set(event_ids)
+        # Converted rows have no event id, so None is in known and must not match
+        results = [r for r in results if not ((r[4] is not None and r[4] in known) or r[:4] in known)]
+        if results:
+            print(f"{date}: {len(results)} late results")
+            matches += [r[:4] for r in results]
+            match_archive.set_matches(date, matches, event_ids + [r[4] for r in results],
+                                      match_archive.get_leagues(date) + [r[5] for r in results])
+            for result in results:
+                if result[4] is not None:
+                    processed_events.add(result[4])
+            save_match_data(date, matches)
+            changed_dates.append(date)
+        if not pending["dates"][date]:
+            del pending["dates"][date]
+
+    if changed_dates:
+        match_archive.save()
+        # A later scrape overlapping these dates must not apply them again
+        processed_events.save()
+    save_pending(pending)
+    fetcher.close()
+
+    if changed_dates:
+        # The archive fingerprints of the changed dates no longer match, so the
+        # incremental rebuild rolls back to the last checkpoint before the earliest one
+        rebuild_statistics(incremental=True)
+    else:
+        print("No late results found")
+
+if __name__ == "__main__":
+    reconcile()
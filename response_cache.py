@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import Counter
+
+from atomic_file import write_json_atomic
+
+CACHE_DIR = "response_cache"
+MAX_CACHE_BYTES = 256 * 1024 * 1024   # Compressed size before least recently used entries are evicted
+
+class ResponseCache:
+    """Content-addressed on-disk cache of compressed response bodies with TTL and LRU eviction"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        """Initialize the cache paths and load its index"""
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def _object_path(self, digest):
+        """Return the file path of a stored body"""
+        return os.path.join(self.objects_dir, f"{digest}.z")
+
+    def get(self, key, allow_expired=False):
+        """Return the cached body for a key, or None if missing or expired"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if not allow_expired and entry["expires"] is not None and entry["expires"] < time.time():
+                return None
+            entry["last_used"] = time.time()
+            digest = entry["hash"]
+
+        try:
+            with open(self._object_path(digest), 'rb') as f:
+                return zlib.decompress(f.read())
+        except (FileNotFoundError, zlib.error):
+            return None
+
+    def put(self, key, body, ttl=None):
+        """Store a body under a key; ttl is in seconds, None keeps it permanently"""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(self.objects_dir):
+            os.makedirs(self.objects_dir, exist_ok=True)
+        if not os.path.exists(path):
+            # Identical bodies share one object file
+            tmp_path = f"{path}.tmp{threading.get_ident()}"
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(body, 6))
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            old_entry = self.entries.get(key)
+            self.entries[key] = {
+                "hash": digest,
+                "size": os.path.getsize(path),
+                "expires": None if ttl is None else now + ttl,
+                "last_used": now
+            }
+            if old_entry and old_entry["hash"] != digest:
+                self._remove_unreferenced(old_entry["hash"])
+            self._evict()
+            self._save_index()
+
+    def _remove_unreferenced(self, digest):
+        """Delete an object file once no entry points at it"""
+        if any(entry["hash"] == digest for entry in self.entries.values()):
+            return
+        try:
+            os.remove(self._object_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its size cap"""
+        sizes = {entry["hash"]: entry["size"] for entry in self.entries.values()}
+        refs = Counter(entry["hash"] for entry in self.entries.values())
+        total = sum(sizes.values())
+        by_age = sorted(self.entries, key=lambda k: self.entries[k]["last_used"], reverse=True)
+        while total > self.max_bytes and len(by_age) > 1:
+            digest = self.entries.pop(by_age.pop())["hash"]
+            refs[digest] -= 1
+            if not refs[digest]:
+                total -= sizes[digest]
+                try:
+                    os.remove(self._object_path(digest))
+                except FileNotFoundError:
+                    pass
+
+    def _save_index(self):
+        """Write the index to a temporary file and move it into place"""
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        write_json_atomic(self.index_path, self.entries)
+
+    def save(self):
+        """Persist last-used times recorded by get()"""
+        with self._lock:
+            if self.entries:
+                self._save_index()
@@ -1,8 +1,20 @@
-import requests
+import argparse
 import json
 import os
 from datetime import datetime, timedelta
+from atomic_file import write_json_atomic
+from fetcher import DateFetcher
+from instrumentation import RunMetrics, add_profiling_arguments
+from league_store import load_league_store
+from load_from_files import convert_match_files, save_match_data
+from event_index import EVENT_INDEX_FILE, EventIndex
 from match_logger import get_logger
+from match_store import ARCHIVE_FILE, MatchArchive
+from response_cache import CACHE_DIR, ResponseCache
+from streak_engine import apply_match
+from team_index import update_index
+from team_registry import load_registry
+from team_store import TEAMS_FILE, TeamStore
 
 # Configuration - Edit these dates as needed
 start_date = datetime.now() - timedelta(days=10)
@@ -15,21 +27,31 @@ HEADERS = {
 }
 OUTPUT_DIR = "match_stats"
 PROCESSED_DATES_FILE = "processed_dates.json"
-SKIPPED_MATCHES_LOG = "skipped_matches.log"
+SKIPPED_MATCHES_LOG = "skipped_matches.jsonl"
+MAX_WORKERS = 8            # Dates fetched concurrently
+REQUESTS_PER_SECOND = 4    # Per-host request rate limit
 
-# Initialize the logger
-match_logger = get_logger(SKIPPED_MATCHES_LOG)
+# Initialize the logger (buffered, structured and indexed by date and team)
+match_logger = get_logger(SKIPPED_MATCHES_LOG, flush_interval=30, background=True, json_lines=True)
 
-def initialize_team():
-    """Return a new team structure with default values"""
-    return {
-        "winstreak": 0,
-        "losestreak": 0,
-        "games_without_win": 0,
-        "games_without_loss": 0,
-        "match_history": [],
-        "last_streak_match": None
-    }
+# Team statistics (teams.json plus a journal of per-date changes)
+team_store = TeamStore(TEAMS_FILE)
+
+# Team name <-> id mapping, including aliases for renamed teams
+registry = load_registry()
+
+# Columnar archive of every saved match
+match_archive = MatchArchive(ARCHIVE_FILE)
+
+# Per-tournament shards of the team statistics
+league_store = load_league_store()
+
+# Stage timers and counters, written to run_metrics.jsonl at the end of the run
+metrics = RunMetrics("scrape")
+
+# Shared keep-alive session for all API requests
+fetcher = DateFetcher(BASE_URL, HEADERS, max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND,
+                      cache=ResponseCache(CACHE_DIR), metrics=metrics)
 
 def create_directory():
     """Create output directory if it doesn't exist"""
@@ -45,223 +67,155 @@ def load_processed_dates():
 
 def save_processed_dates(processed_dates):
     """Save processed dates to file"""
-    with open(PROCESSED_DATES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(list(processed_dates), f, indent=4)
+    write_json_atomic(PROCESSED_DATES_FILE, list(processed_dates), indent=4)
 
 def get_matches(date):
     """Fetch matches for a specific date"""
-    try:
-        url = BASE_URL.format(date=date)
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        return response.json().get('events', [])
-    except Exception as e:
-        print(f"Error fetching {date}: {str(e)}")
-        return []
+    return fetcher.get_fixtures(date)
+
+def process_matches(date, fixtures, teams, processed_matches):
+    """Process matches and update team statistics
 
-def process_matches(date, events, teams, processed_matches):
-    """Process matches and update team statistics"""
+    fixtures may be any iterable of Fixture tuples. main() passes lists, since
+    dates are downloaded ahead in fetcher threads and only processed in
+    order; streaming there only bounds the parsed-object footprint.
+    """
     match_records = []
+    team_count = len(teams)
     
-    for event in events:
+    for fixture in fixtures:
         try:
-            ht = event['homeTeam']['name']
-            at = event['awayTeam']['name']
-            hsc = event.get('homeScore', {}).get('current', None)
-            asc = event.get('awayScore', {}).get('current', None)
+            event_id, ht, at, hsc, asc = fixture[:5]
             
             # Skip unplayed or postponed matches where scores are None
             if hsc is None or asc is None:
                 # Log to file instead of printing to terminal
-                match_logger.log_skipped_match(date, ht, at)
+                match_logger.log_skipped_match(date, ht, at, event_id=event_id)
+                metrics.count("matches_skipped")
                 continue
                 
-            match_id = (ht, at, hsc, asc)
-
-            # Skip if match already processed
-            if match_id in processed_matches:
+            # Skip if match already processed, in this run or an earlier one
+            home_id, away_id = registry.intern(ht), registry.intern(at)
+            if not apply_match(teams, processed_matches, date, home_id, away_id, hsc, asc, match_id=event_id):
+                metrics.count("matches_deduplicated")
                 continue
-            processed_matches.add(match_id)
+            metrics.count("matches_applied")
 
-            # Initialize teams if they don't exist
-            if ht not in teams:
-                teams[ht] = initialize_team()
-            if at not in teams:
-                teams[at] = initialize_team()
-
-            # Determine match result
-            if hsc > asc:
-                ht_result = 'w'
-                at_result = 'l'
-            elif hsc < asc:
-                ht_result = 'l'
-                at_result = 'w'
-            elif hsc == asc:
-                ht_result = 'd'
-                at_result = 'd'
-            else:
-                # This should not happen, but just in case
-                print(f"Unexpected score situation: {ht} {hsc} - {asc} {at}")
-                continue
+            # Create match record for the match archive, with the names as the API sent them
+            match_records.append((ht, at, hsc, asc, event_id, (fixture.country, fixture.tournament)))
 
-            # Create compact match records with date and score
-            ht_match_detail = [
-                date,           # date
-                at,             # opponent
-                ht_result,      # result (w/l/d)
-                f"{hsc}-{asc}"  # score
-            ]
-            
-            at_match_detail = [
-                date,           # date
-                ht,             # opponent
-                at_result,      # result (w/l/d)
-                f"{asc}-{hsc}"  # score
-            ]
-
-            # Track previous streak values to detect changes
-            ht_prev_without_win = teams[ht]["games_without_win"]
-            ht_prev_without_loss = teams[ht]["games_without_loss"]
-            at_prev_without_win = teams[at]["games_without_win"]
-            at_prev_without_loss = teams[at]["games_without_loss"]
-
-            # Update home team stats based on match result
-            if hsc > asc:  # Home team won
-                # Record this win if it's the start of a new win streak
-                teams[ht]["winstreak"] += 1
-                teams[ht]["losestreak"] = 0
-                teams[ht]["games_without_win"] = 0
-                teams[ht]["games_without_loss"] += 1
-                # Store this match as the last win before a potential "without win" streak
-                teams[ht]["last_streak_match"] = ht_match_detail
-                
-            elif hsc < asc:  # Home team lost
-                # Record this loss as the transition point for "games_without_loss"
-                if teams[ht]["games_without_loss"] > 0:
-                    teams[ht]["last_streak_match"] = ht_match_detail
-                    teams[ht]["match_history"] = []
-                
-                teams[ht]["losestreak"] += 1
-                teams[ht]["winstreak"] = 0
-                teams[ht]["games_without_win"] += 1
-                teams[ht]["games_without_loss"] = 0
-                
-            elif hsc == asc:  # Draw
-                teams[ht]["winstreak"] = 0
-                teams[ht]["losestreak"] = 0
-                teams[ht]["games_without_win"] += 1
-                teams[ht]["games_without_loss"] += 1
-
-            # Always add the current match to match history - it's part of the current streak
-            teams[ht]["match_history"].append(ht_match_detail)
-            
-            # For 'games_without_loss' streak, keep all those matches
-            if teams[ht]["games_without_loss"] > 0:
-                # Ensure we only keep the matches that are part of the current streak
-                teams[ht]["match_history"] = teams[ht]["match_history"][-teams[ht]["games_without_loss"]:]
-            # For 'games_without_win' streak, keep all those matches 
-            elif teams[ht]["games_without_win"] > 0:
-                teams[ht]["match_history"] = teams[ht]["match_history"][-teams[ht]["games_without_win"]:]
-
-            # Update away team stats based on match result
-            if asc > hsc:  # Away team won
-                teams[at]["winstreak"] += 1
-                teams[at]["losestreak"] = 0
-                teams[at]["games_without_win"] = 0
-                teams[at]["games_without_loss"] += 1
-                # Store this match as the last win before a potential "without win" streak
-                teams[at]["last_streak_match"] = at_match_detail
-                
-            elif asc < hsc:  # Away team lost
-                # Record this loss as the transition point for "games_without_loss"
-                if teams[at]["games_without_loss"] > 0:
-                    teams[at]["last_streak_match"] = at_match_detail
-                    teams[at]["match_history"] = []
-                
-                teams[at]["losestreak"] += 1
-                teams[at]["winstreak"] = 0
-                teams[at]["games_without_win"] += 1
-                teams[at]["games_without_loss"] = 0
-                
-            elif asc == hsc:  # Draw
-                teams[at]["winstreak"] = 0
-                teams[at]["losestreak"] = 0
-                teams[at]["games_without_win"] += 1
-                teams[at]["games_without_loss"] += 1
-            
-            # Always add the current match to match history - it's part of the current streak
-            teams[at]["match_history"].append(at_match_detail)
-            
-            # For 'games_without_loss' streak, keep all those matches
-            if teams[at]["games_without_loss"] > 0:
-                # Ensure we only keep the matches that are part of the current streak
-                teams[at]["match_history"] = teams[at]["match_history"][-teams[at]["games_without_loss"]:]
-            # For 'games_without_win' streak, keep all those matches
-            elif teams[at]["games_without_win"] > 0:
-                teams[at]["match_history"] = teams[at]["match_history"][-teams[at]["games_without_win"]:]
-
-            # Create match record for output file
-            match_records.append(f"{ht}, {hsc}\n{at}, {asc}")
-
-        except KeyError as e:
-            print(f"Error processing match: Missing key {e}")
         except Exception as e:
             print(f"Error processing match: {e}")
     
+    metrics.count("teams_created", len(teams) - team_count)
     return match_records
 
-def save_data(date, match_records, teams):
-    """Save match results and team statistics"""
-    # Save match results
+def save_data(date, match_records, teams, partial=False):
+    """Save match results and team statistics; partial marks a date that is still in progress"""
+    # Save match results, keeping rows saved earlier for the same date
     if match_records:
-        filename = f"scores_{date}.txt"
-        file_path = os.path.join(OUTPUT_DIR, filename)
+        matches = match_archive.get_matches(date) + [record[:4] for record in match_records]
+        try:
+            event_ids = match_archive.get_event_ids(date) + [record[4] for record in match_records]
+            leagues = match_archive.get_leagues(date) + [record[5] for record in match_records]
+            match_archive.set_matches(date, matches, event_ids, leagues)
+            match_archive.save()
+            print(f"Saved {len(match_records)} match results for {date} to {ARCHIVE_FILE}")
+        except Exception as e:
+            print(f"Error saving {ARCHIVE_FILE}: {str(e)}")
+        # The text files stay the tracked copy the archive can be rebuilt from
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write('\n\n'.join(match_records))
-            print(f"Saved match results to {filename}")
+            save_match_data(date, matches)
         except Exception as e:
-            print(f"Error saving {filename}: {str(e)}")
+            print(f"Error saving scores_{date}.txt: {str(e)}")
     
-    # Save team statistics
+    # Journal only the teams that played on this date
+    changed_teams = {registry.intern(team) for record in match_records for team in record[:2]}
+    try:
+        team_store.commit(date, teams, changed_teams, registry, partial)
+        print(f"Team statistics for {len(changed_teams)} teams committed to {team_store.journal_path}")
+    except Exception as e:
+        print(f"Error saving {team_store.journal_path}: {str(e)}")
+
+    # Keep the leaderboards in step with the journal
     try:
-        with open("teams.json", 'w', encoding='utf-8') as f:
-            json.dump(teams, f, indent=4, ensure_ascii=False)
-        print("Team statistics updated in teams.json")
+        update_index(teams, changed_teams, registry)
     except Exception as e:
-        print(f"Error saving teams.json: {str(e)}")
+        print(f"Error updating team index: {str(e)}")
 
-def main():
+    # Only the shards of the leagues these teams play in are touched
+    for record in match_records:
+        home_team, away_team = (registry.names[registry.intern(team)] for team in record[:2])
+        league_store.add_match(date, home_team, away_team, record[5])
+    try:
+        league_store.update(teams, registry, changed_teams)
+    except Exception as e:
+        print(f"Error updating league shards: {str(e)}")
+
+def main(profile=False, trace_memory=False):
     """Main program execution"""
+    metrics.start_profiling(profile, trace_memory)
+
     # Load existing team data
-    try:
-        with open("teams.json", 'r', encoding='utf-8') as f:
-            teams = json.load(f)
-    except FileNotFoundError:
-        teams = {}
+    with metrics.stage("load"):
+        teams = registry.load_states(team_store.load())
+    if not teams:
         print("Created new teams database")
 
     create_directory()
-    processed_matches = set()
-    processed_dates = load_processed_dates()
-
+    with metrics.stage("load"):
+        if not match_archive.exists():
+            # Carry over any scores_*.txt history before the first archive write
+            convert_match_files(ARCHIVE_FILE)
+        match_archive.load()
+        # Event ids applied by any earlier run are never applied twice
+        processed_matches = EventIndex(EVENT_INDEX_FILE).load()
+    # Dates journaled by an interrupted run count as processed
+    processed_dates = load_processed_dates() | team_store.committed_dates
+
+    pending_dates = []
     for date in DATES:
         if date in processed_dates:
             print(f"\nSkipping {date}, already processed.")
-            continue
-
+        else:
+            pending_dates.append(date)
+
+    # Dates are fetched concurrently but handed back in chronological order;
+    # "fetch" and "parse" are timed by the fetcher threads, "wait" is the time
+    # this loop spends blocked on them
+    results = fetcher.fetch_in_order(pending_dates)
+    while True:
+        with metrics.stage("wait"):
+            date, fixtures = next(results, (None, None))
+        if date is None:
+            break
         print(f"\nProcessing {date}...")
-        events = get_matches(date)
         
-        if not events:
+        if not fixtures:
             print(f"No matches found for {date}")
             continue
             
-        match_records = process_matches(date, events, teams, processed_matches)
-        save_data(date, match_records, teams)
-        processed_dates.add(date)
-
-    save_processed_dates(processed_dates)
+        with metrics.stage("process", date):
+            match_records = process_matches(date, fixtures, teams, processed_matches)
+        with metrics.stage("save", date):
+            save_data(date, match_records, teams)
+            processed_matches.save()
+            processed_dates.add(date)
+            save_processed_dates(processed_dates)
+            team_store.compact_if_needed(teams, registry)
+        metrics.count("dates_processed")
+        metrics.end_date(date)
+
+    with metrics.stage("save"):
+        save_processed_dates(processed_dates)
+        if team_store.journal_entries:
+            team_store.compact(teams, registry)
+    fetcher.close()
+    match_logger.close()
+    metrics.write_summary()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch new match results and update team statistics")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    main(profile=args.profile, trace_memory=args.trace_memory)
\ No newline at end of file
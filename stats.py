@@ -1,7 +1,14 @@
 import argparse
+import heapq
 import json
-import requests
-from datetime import datetime
+import os
+import socket
+from datetime import datetime, timedelta
+from team_store import TEAMS_FILE
+
+# Everything else is imported where it is needed, so a query answered by the
+# resident server (stats_server.py) does not pay for requests, sqlite3 and the
+# archive modules
 
 # Configuration
 BASE_URL = "https://api.sofascore.com/api/v1/sport/football/scheduled-events/{date}"
@@ -9,112 +16,420 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
+# Categories to analyze
+CATEGORIES = {
+    "winstreak": "Current Win Streak",
+    "losestreak": "Current Lose Streak",
+    "games_without_win": "Matches Without Win",
+    "games_without_loss": "Matches Without Loss"
+}
+
+# Date-range reports
+RANGE_WORKERS = 8                   # Fixture lists fetched concurrently
+RANGE_REPORT_FILE = "range_report"  # Default output name; the format is the extension
+
+# Resident stats server
+STATS_SOCKET = "stats.sock"   # Unix socket in the working directory
+STATS_PORT = 8642             # Local TCP port where Unix sockets are not available
+SERVER_TIMEOUT = 60           # Seconds to wait for a reply (date queries may fetch fixtures)
+
+def connect_server():
+    """Connect to the resident stats server; return the socket, or None if none is running"""
+    try:
+        if hasattr(socket, "AF_UNIX"):
+            if not os.path.exists(STATS_SOCKET):
+                return None
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.connect(STATS_SOCKET)
+        else:
+            conn = socket.create_connection(("127.0.0.1", STATS_PORT), timeout=1)
+    except OSError:
+        return None
+    conn.settimeout(SERVER_TIMEOUT)
+    return conn
+
+def query_server(request):
+    """Send one JSON query to the resident server; return its reply, or None if no server is running"""
+    conn = connect_server()
+    if conn is None:
+        return None
+    with conn:
+        conn.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b"\n")
+        data = b"".join(iter(lambda: conn.recv(65536), b""))
+    reply = json.loads(data.decode('utf-8'))
+    if "error" in reply:
+        print(f"Error from stats server: {reply['error']}")
+        exit(1)
+    return reply
+
 def load_team_data():
     """Load existing team statistics"""
-    try:
-        with open("teams.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
+    from team_store import load_teams
+    if not os.path.exists(TEAMS_FILE):
         print("Error: teams.json not found. Run the main scraper first.")
         exit(1)
+    return load_teams(TEAMS_FILE)
 
-def get_daily_teams(date):
-    """Get teams playing on specified date"""
+def open_team_index():
+    """Open the team statistics index, or return None if it has not been built yet"""
+    from team_index import INDEX_FILE, TeamIndex
+    if os.path.exists(INDEX_FILE):
+        return TeamIndex(INDEX_FILE)
+    return None
+
+def get_fixture_teams(date, fixtures, league=None):
+    """Return the set of teams with a fixture starting on date (UTC), optionally in one league only"""
+    from league_store import league_matches
+    teams = set()
+    for fixture in fixtures:
+        if fixture.start_timestamp is None:
+            continue
+        if league and not league_matches(league, fixture.country, fixture.tournament):
+            continue
+        event_date_str = datetime.utcfromtimestamp(fixture.start_timestamp).strftime('%Y-%m-%d')
+        if event_date_str == date:
+            teams.add(fixture.home_team)
+            teams.add(fixture.away_team)
+    return teams
+
+def fetch_daily_teams(date, offline=False, league=None):
+    """Return the teams playing on a date, optionally in one league only; fetch errors are raised"""
+    from fetcher import DateFetcher, NotCachedError
+    from response_cache import CACHE_DIR, ResponseCache
+
+    # Dates already fetched by the scraper are answered from the shared cache
+    fetcher = DateFetcher(BASE_URL, HEADERS, max_workers=1, cache=ResponseCache(CACHE_DIR), offline=offline)
     try:
-        url = BASE_URL.format(date=date)
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        events = response.json().get("events", [])
-        
-        teams = set()
-        for event in events:
-            event_date = event["startTimestamp"]
-            event_date_str = datetime.utcfromtimestamp(event_date).strftime('%Y-%m-%d')
-            if event_date_str == date:
-                teams.add(event["homeTeam"]["name"])
-                teams.add(event["awayTeam"]["name"])
+        teams = get_fixture_teams(date, fetcher.stream_fixtures(date), league)
         
         print(f"Teams playing on {date}: {teams}")  # Debug print
         return list(teams)
-    
+    except NotCachedError as e:
+        print(str(e))
+        return []
+    finally:
+        fetcher.close()
+
+def get_daily_teams(date, offline=False, league=None):
+    """Get teams playing on specified date"""
+    try:
+        return fetch_daily_teams(date, offline, league)
     except Exception as e:
         print(f"Error fetching matches: {e}")
         exit(1)
 
-def analyze_date(date):
-    """Analyze teams playing on specific date"""
-    # Get teams playing that day
-    daily_teams = get_daily_teams(date)
-    print(f"Daily teams: {daily_teams}")  # Debug print
-    
+class ReverseName:
+    """Wrap a team name so that heap comparisons order names in reverse"""
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __lt__(self, other):
+        return other.name < self.name
+
+    def __eq__(self, other):
+        return self.name == other.name
+
+def rank_teams(teams, categories, top):
+    """Return the top (team, value) pairs per category in one pass, ties broken by name"""
+    heaps = {cat: [] for cat in categories}
+    for team, stats in teams.items():
+        key = ReverseName(team)
+        for cat, heap in heaps.items():
+            # The heap root is the weakest entry kept: lowest value, then last name
+            entry = (stats[cat], key)
+            if len(heap) < top:
+                heapq.heappush(heap, entry)
+            elif heap[0] < entry:
+                heapq.heapreplace(heap, entry)
+    return {
+        cat: [(key.name, value) for value, key in sorted(heap, reverse=True)]
+        for cat, heap in heaps.items()
+    }
+
+def get_leaderboards(team_names=None, top=3):
+    """Rank the given teams (or all teams when None) in every category"""
+    index = open_team_index()
+    if index:
+        # Answer from the pre-sorted leaderboards without loading teams.json
+        leaderboards = {cat: index.top_teams(cat, team_names, limit=top) for cat in CATEGORIES}
+        index.close()
+        return leaderboards
+
     # Load all team stats
     all_teams = load_team_data()
+    if team_names is not None:
+        all_teams = {team: all_teams[team] for team in team_names if team in all_teams}
+    return rank_teams(all_teams, CATEGORIES, top)
+
+def merge_leaderboards(leaderboards, top=3):
+    """Combine several leaderboards into one, keeping each team once, ties broken by name"""
+    merged = {}
+    for cat in CATEGORIES:
+        values = {}
+        for board in leaderboards:
+            values.update(board[cat])
+        merged[cat] = sorted(values.items(), key=lambda item: (-item[1], item[0]))[:top]
+    return merged
+
+def get_league_leaderboards(league, team_names=None, top=3):
+    """Rank a league's teams (or only the given ones among them) from the league's shards
+
+    Returns None if no league matches.
+    """
+    from league_store import load_league_store
+    store = load_league_store()
+    keys = store.find_leagues(league)
+    if not keys:
+        return None
+
+    boards = []
+    for key in keys:
+        shard = store.open_shard(key)
+        if shard is None:
+            continue
+        names = store.get_members(key)
+        if team_names is not None:
+            wanted = set(team_names)
+            names = [name for name in names if name in wanted]
+        boards.append({cat: shard.top_teams(cat, names, limit=top) for cat in CATEGORIES})
+        shard.close()
+    return merge_leaderboards(boards, top)
+
+def rank_history(history, date, team_names, top=3):
+    """Rank teams by their streaks in a StreakHistory as they stood before date's matches
+
+    Returns None if there is no history or date is later than its last date.
+    """
+    if history is None or history.get_last_date() is None or date > history.get_last_date():
+        return None
+    return rank_teams(history.get_states_before(date, team_names), CATEGORIES, top)
+
+def get_historical_leaderboards(date, team_names, top=3):
+    """Rank teams by their streaks as they stood before date's matches, or None if date is not in the past of the archive"""
+    from streak_history import load_streak_history
+    return rank_history(load_streak_history(), date, team_names, top)
+
+def print_leaderboards(title, leaderboards):
+    """Print one ranked list per category"""
+    print(f"\n{title}:")
+    print("=" * 40)
     
-    # Filter to only teams playing that day
-    filtered_teams = {team: all_teams[team] for team in daily_teams if team in all_teams}
-    print(f"Filtered teams: {filtered_teams}")  # Debug print
-    
-    if not filtered_teams:
+    for cat, label in CATEGORIES.items():
+        print(f"\n{label}:")
+        for idx, (team, value) in enumerate(leaderboards[cat], 1):
+            print(f"{idx}. {team}: {value}")
+
+def analyze_date(date, top=3, offline=False, use_server=True, league=None):
+    """Analyze teams playing on specific date, optionally in one league only"""
+    request = {"query": "date", "date": date, "top": top, "offline": offline, "league": league}
+    reply = query_server(request) if use_server else None
+    if reply is not None:
+        daily_teams, leaderboards = reply["teams"], reply["leaderboards"]
+        print(f"Daily teams: {daily_teams}")  # Debug print
+    else:
+        # Get teams playing that day
+        daily_teams = get_daily_teams(date, offline, league)
+        print(f"Daily teams: {daily_teams}")  # Debug print
+
+        # Past dates are ranked on the streaks going into that matchday, not today's
+        leaderboards = get_historical_leaderboards(date, daily_teams, top)
+        if leaderboards is None and league:
+            leaderboards = get_league_leaderboards(league, daily_teams, top)
+        if leaderboards is None:
+            leaderboards = get_leaderboards(daily_teams, top)
+    if not any(leaderboards.values()):
         print(f"No team data available for matches on {date}")
         return
     
-    # Categories to analyze
-    categories = {
-        "winstreak": "Current Win Streak",
-        "losestreak": "Current Lose Streak", 
-        "games_without_win": "Matches Without Win",
-        "games_without_loss": "Matches Without Loss"
-    }
-    
-    print(f"\nTop performers for {date} matches:")
-    print("=" * 40)
+    title = f"Top performers for {date} {league} matches" if league else f"Top performers for {date} matches"
+    print_leaderboards(title, leaderboards)
+
+def analyze_all_teams(top=3, use_server=True, league=None):
+    """Rank every tracked team (or every team in a league), not only those playing on a given date"""
+    reply = query_server({"query": "global", "top": top, "league": league}) if use_server else None
+    if reply is not None:
+        leaderboards = reply["leaderboards"]
+    elif league:
+        leaderboards = get_league_leaderboards(league, None, top)
+    else:
+        leaderboards = get_leaderboards(None, top)
+    if leaderboards is None:
+        print(f"No league matching '{league}'; leagues are recorded as matches are scraped")
+        return
+    if not any(leaderboards.values()):
+        print("No team data available")
+        return
     
-    for cat, label in categories.items():
-        # Sort teams by category value descending
-        sorted_teams = sorted(
-            filtered_teams.items(),
-            key=lambda x: x[1][cat],
-            reverse=True
-        )[:3]  # Get top 3
-        
-        print(f"\n{label}:")
-        for idx, (team, stats) in enumerate(sorted_teams, 1):
-            print(f"{idx}. {team}: {stats[cat]}")
+    print_leaderboards(f"Top performers across {league}" if league else "Top performers across all teams",
+                       leaderboards)
 
-def show_team_stats(team_name):
+def get_range_dates(start, end):
+    """Return every YYYY-MM-DD date from start to end, inclusive"""
+    first = datetime.strptime(start, "%Y-%m-%d")
+    days = (datetime.strptime(end, "%Y-%m-%d") - first).days
+    return [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
+
+def get_range_leaderboards(start, end, top=3, offline=False, league=None):
+    """Return {date: {"teams": count, "leaderboards": ...}} for every date from start to end
+
+    Fixture lists are fetched RANGE_WORKERS at a time (or read from the
+    response cache) and handed back in date order. The streak history and,
+    for dates past it, the current team state are each loaded once. A date
+    whose fixtures could not be fetched gets no leaderboards but "error"
+    (the message) or, offline with nothing cached, "missing": true.
+    """
+    from fetcher import DateFetcher, NotCachedError
+    from response_cache import CACHE_DIR, ResponseCache
+    from streak_history import load_streak_history
+
+    history = load_streak_history()
+    current_teams = None
+    report = {}
+    fetcher = DateFetcher(BASE_URL, HEADERS, max_workers=RANGE_WORKERS, cache=ResponseCache(CACHE_DIR),
+                          offline=offline)
+    try:
+        for date, (fixtures, error) in fetcher.fetch_in_order(get_range_dates(start, end), fetcher.try_fixtures):
+            if isinstance(error, NotCachedError):
+                report[date] = {"teams": 0, "leaderboards": {}, "missing": True}
+                continue
+            if error is not None:
+                print(f"Error fetching {date}: {str(error)}")
+                report[date] = {"teams": 0, "leaderboards": {}, "error": str(error)}
+                continue
+            daily_teams = sorted(get_fixture_teams(date, fixtures, league))
+            # Past dates are ranked on the streaks going into that matchday, not today's
+            leaderboards = rank_history(history, date, daily_teams, top)
+            if leaderboards is None:
+                if current_teams is None:
+                    current_teams = load_team_data()
+                leaderboards = rank_teams({team: current_teams[team] for team in daily_teams if team in current_teams},
+                                          CATEGORIES, top)
+            report[date] = {"teams": len(daily_teams), "leaderboards": leaderboards}
+    finally:
+        fetcher.close()
+    return report
+
+def write_range_report(report, path, report_format="json"):
+    """Write per-date leaderboards as one JSON document or as CSV rows (date, category, rank, team, value)"""
+    import csv
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if report_format == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["date", "category", "rank", "team", "value"])
+            for date, day in report["dates"].items():
+                for cat, leaders in day["leaderboards"].items():
+                    for idx, (team, value) in enumerate(leaders, 1):
+                        writer.writerow([date, cat, idx, team, value])
+        else:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+
+def analyze_range(start, end, top=3, offline=False, league=None, report_format="json", path=None):
+    """Rank the teams playing on every date in a range and write a single report"""
+    if start > end:
+        print("--from must not be after --to")
+        return
+    path = path or f"{RANGE_REPORT_FILE}.{report_format}"
+    dates = get_range_leaderboards(start, end, top, offline, league)
+    report = {"from": start, "to": end, "top": top, "league": league, "dates": dates}
+    write_range_report(report, path, report_format)
+    failed = sum(1 for day in dates.values() if "error" in day)
+    missing = sum(1 for day in dates.values() if day.get("missing"))
+    print(f"Leaderboards for {len(dates)} dates ({sum(day['teams'] for day in dates.values())} team-days) "
+          f"written to {path}; {failed} dates failed to fetch, {missing} not cached")
+
+def format_match(match):
+    """Format a [date, opponent, result, score] record for display"""
+    date, opponent, result, score = match
+    return f"{date} {result.upper()} {score} vs {opponent}"
+
+def find_team(team_name):
+    """Return (name, record) for a team, trying the name as given and then title-cased; record is None if not found"""
+    from team_store import load_team
+    if not os.path.exists(TEAMS_FILE):
+        print("Error: teams.json not found. Run the main scraper first.")
+        exit(1)
+
+    index = open_team_index()
+    team_stats = None
+    for name in dict.fromkeys((team_name, team_name.title())):
+        team_stats = index.get_team(name) if index else load_team(name)
+        if team_stats:
+            team_name = name
+            break
+    if index:
+        index.close()
+    return team_name, team_stats
+
+def show_team_stats(team_name, use_server=True):
     """Display statistics for a specific team"""
-    teams = load_team_data()
-    team_stats = teams.get(team_name.title())
+    reply = query_server({"query": "team", "name": team_name}) if use_server else None
+    if reply is not None:
+        team_name, team_stats = reply["name"], reply["record"]
+    else:
+        team_name, team_stats = find_team(team_name)
     
     if not team_stats:
         print(f"Team '{team_name}' not found in database")
         return
     
-    print(f"\nStatistics for {team_name.title()}:")
+    last_streak_match = team_stats['last_streak_match']
+    print(f"\nStatistics for {team_name}:")
     print(f"- Current win streak: {team_stats['winstreak']}")
     print(f"- Current lose streak: {team_stats['losestreak']}")
     print(f"- Matches without win: {team_stats['games_without_win']}")
     print(f"- Matches without loss: {team_stats['games_without_loss']}")
-    print(f"- Last matches: {' '.join(team_stats['last_matches'])}")
-    print(f"- Last matches with opponents: {' | '.join(team_stats['last_matches_with_opponents'])}")
+    print(f"- Current streak matches: {' | '.join(format_match(m) for m in team_stats['match_history']) or 'none'}")
+    print(f"- Last streak match: {format_match(last_streak_match) if last_streak_match else 'none'}")
 
 def main():
     parser = argparse.ArgumentParser(description="Team Statistics Analyzer")
     parser.add_argument("--date", help="Date to analyze (YYYY-MM-DD)")
     parser.add_argument("--team", help="Team name to show statistics")
+    parser.add_argument("--top", type=int, default=3, help="Number of teams per leaderboard (default: 3)")
+    parser.add_argument("--global", dest="global_mode", action="store_true",
+                        help="Rank all tracked teams instead of those playing on --date")
+    parser.add_argument("--offline", action="store_true",
+                        help="Read fixtures only from the local response cache")
+    parser.add_argument("--from", dest="date_from", help="First date of a range report (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="Last date of a range report (YYYY-MM-DD)")
+    parser.add_argument("--format", choices=("json", "csv"), default="json", help="Range report format")
+    parser.add_argument("--output", help=f"Range report file (default: {RANGE_REPORT_FILE}.<format>)")
+    parser.add_argument("--league", help="Only teams in this tournament or country (e.g. 'Premier League', 'England')")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run the resident stats server that later queries are answered from")
+    parser.add_argument("--no-server", dest="use_server", action="store_false",
+                        help="Answer locally even if the stats server is running")
     
     args = parser.parse_args()
     
-    if args.date:
+    if args.serve:
+        from stats_server import serve
+        serve()
+    elif args.top < 1:
+        print("--top must be at least 1")
+    elif args.date_from or args.date_to:
+        try:
+            for value in (args.date_from, args.date_to):
+                datetime.strptime(value or "", "%Y-%m-%d")
+        except ValueError:
+            print("Specify both --from and --to as YYYY-MM-DD")
+        else:
+            analyze_range(args.date_from, args.date_to, args.top, args.offline, args.league, args.format, args.output)
+    elif args.global_mode:
+        analyze_all_teams(args.top, args.use_server, args.league)
+    elif args.date:
         try:
             datetime.strptime(args.date, "%Y-%m-%d")
-            analyze_date(args.date)
         except ValueError:
             print("Invalid date format. Use YYYY-MM-DD")
+        else:
+            analyze_date(args.date, args.top, args.offline, args.use_server, args.league)
     elif args.team:
-        show_team_stats(args.team)
+        show_team_stats(args.team, args.use_server)
     else:
-        print("Please specify either --date or --team")
+        print("Please specify --date, --from/--to, --team or --global")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
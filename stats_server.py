@@ -0,0 +1,168 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+
+from league_store import LEAGUES_FILE, load_league_store
+from match_store import ARCHIVE_FILE
+from stats import CATEGORIES, STATS_PORT, STATS_SOCKET, fetch_daily_teams, rank_history, rank_teams
+from streak_history import load_streak_history
+from team_store import TEAMS_FILE, TeamStore, load_teams
+
+RELOAD_INTERVAL = 2   # Seconds between checks for newly published state
+
+def get_publish_stamp():
+    """Return the (size, mtime) of every file the served state is read from; None for a missing file"""
+    stamp = []
+    for path in (TEAMS_FILE, TeamStore(TEAMS_FILE).journal_path, ARCHIVE_FILE, LEAGUES_FILE):
+        try:
+            stat = os.stat(path)
+            stamp.append((stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+class StatsSnapshot:
+    """Team records, sorted leaderboards, league membership and streak history loaded once from the published files"""
+
+    def __init__(self):
+        """Load the current state; the stamp is taken first so a publish during loading triggers a reload"""
+        self.stamp = get_publish_stamp()
+        self.teams = load_teams(TEAMS_FILE) if os.path.exists(TEAMS_FILE) else {}
+        # Same order as the index: highest value first, ties by name
+        self.rankings = {cat: sorted(self.teams, key=lambda team: (-self.teams[team][cat], team))
+                         for cat in CATEGORIES}
+        self.history = load_streak_history()
+        self.leagues = load_league_store()
+
+    def get_team(self, team_name):
+        """Return (name, record) trying the name as given and then title-cased; record is None if not found"""
+        for name in dict.fromkeys((team_name, team_name.title())):
+            if name in self.teams:
+                return name, self.teams[name]
+        return team_name, None
+
+    def get_leaderboards(self, team_names=None, top=3, league=None):
+        """Rank the given teams (or all teams when None) in every category
+
+        With a league, only its members are ranked; None is returned if no league matches.
+        """
+        if league:
+            keys = self.leagues.find_leagues(league)
+            if not keys:
+                return None
+            members = set().union(*(self.leagues.get_members(key) for key in keys))
+            team_names = members if team_names is None else [team for team in team_names if team in members]
+        if team_names is None:
+            return {cat: [(team, self.teams[team][cat]) for team in ranking[:top]]
+                    for cat, ranking in self.rankings.items()}
+        return rank_teams({team: self.teams[team] for team in team_names if team in self.teams}, CATEGORIES, top)
+
+class StatsService:
+    """Answer stats queries from the current snapshot, swapping in a new one when state is published"""
+
+    def __init__(self):
+        """Load the first snapshot"""
+        self.snapshot = StatsSnapshot()
+        self.daily_teams = {}
+        print(f"Loaded {len(self.snapshot.teams)} teams")
+
+    def reload_if_published(self):
+        """Load a new snapshot if the scraper or a rebuild has written new state"""
+        if get_publish_stamp() == self.snapshot.stamp:
+            return False
+        start = time.perf_counter()
+        # Queries keep using the old snapshot until the new one is complete
+        self.snapshot = StatsSnapshot()
+        print(f"Reloaded {len(self.snapshot.teams)} teams in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def watch(self, interval=RELOAD_INTERVAL):
+        """Check for published state forever; run in a background thread"""
+        while True:
+            time.sleep(interval)
+            try:
+                self.reload_if_published()
+            except Exception as e:
+                print(f"Error reloading team statistics: {str(e)}")
+
+    def get_daily_teams(self, date, offline=False, league=None):
+        """Return the teams playing on a date, remembering past dates whose fixtures will not change"""
+        teams = self.daily_teams.get((date, league))
+        if teams is None:
+            teams = fetch_daily_teams(date, offline, league)
+            if date < datetime.now().strftime("%Y-%m-%d"):
+                self.daily_teams[(date, league)] = teams
+        return teams
+
+    def handle(self, request):
+        """Return the reply to one query"""
+        snapshot = self.snapshot
+        query = request.get("query")
+        top = request.get("top", 3)
+        league = request.get("league")
+        if query == "team":
+            name, record = snapshot.get_team(request["name"])
+            return {"name": name, "record": record}
+        if query == "global":
+            return {"leaderboards": snapshot.get_leaderboards(None, top, league)}
+        if query == "date":
+            date = request["date"]
+            teams = self.get_daily_teams(date, request.get("offline", False), league)
+            # Past dates are ranked on the streaks going into that matchday, not today's
+            leaderboards = rank_history(snapshot.history, date, teams, top)
+            if leaderboards is None and league:
+                leaderboards = snapshot.get_leaderboards(teams, top, league)
+            if leaderboards is None:
+                leaderboards = snapshot.get_leaderboards(teams, top)
+            return {"teams": teams, "leaderboards": leaderboards}
+        raise ValueError(f"Unknown query: {query}")
+
+class StatsRequestHandler(socketserver.StreamRequestHandler):
+    """Read one JSON query line and write one JSON reply line"""
+
+    def handle(self):
+        try:
+            reply = self.server.service.handle(json.loads(self.rfile.readline().decode('utf-8')))
+        except Exception as e:
+            reply = {"error": str(e)}
+        self.wfile.write(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b"\n")
+
+def create_server():
+    """Bind the server to the stats socket (or local TCP port where Unix sockets are unavailable)"""
+    if not hasattr(socket, "AF_UNIX"):
+        return socketserver.ThreadingTCPServer(("127.0.0.1", STATS_PORT), StatsRequestHandler)
+
+    if os.path.exists(STATS_SOCKET):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(STATS_SOCKET)
+            raise RuntimeError(f"A stats server is already listening on {STATS_SOCKET}")
+        except ConnectionRefusedError:
+            # Left behind by a server that did not shut down cleanly
+            os.remove(STATS_SOCKET)
+        finally:
+            probe.close()
+    return socketserver.ThreadingUnixStreamServer(STATS_SOCKET, StatsRequestHandler)
+
+def serve():
+    """Load the team state and answer queries until interrupted"""
+    server = create_server()
+    server.daemon_threads = True
+    server.service = StatsService()
+    threading.Thread(target=server.service.watch, daemon=True).start()
+    print(f"Serving stats queries on {server.server_address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        server.server_close()
+        if hasattr(socket, "AF_UNIX") and os.path.exists(STATS_SOCKET):
+            os.remove(STATS_SOCKET)
+
+if __name__ == "__main__":
+    serve()
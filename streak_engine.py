@@ -0,0 +1,201 @@
+import time
+from collections import deque
+
+MAX_HISTORY_DEPTH = 64   # Most recent streak matches kept per team
+
+def new_history(matches=(), max_depth=MAX_HISTORY_DEPTH):
+    """Return a bounded match history, optionally seeded with existing matches"""
+    return deque(matches, maxlen=max_depth)
+
+class TeamState:
+    """Streak counters and current-streak match history for one team"""
+
+    __slots__ = ("winstreak", "losestreak", "games_without_win", "games_without_loss",
+                 "match_history", "last_streak_match")
+
+    def __init__(self):
+        """Initialize a team with no matches played"""
+        self.winstreak = 0
+        self.losestreak = 0
+        self.games_without_win = 0
+        self.games_without_loss = 0
+        self.match_history = new_history()
+        self.last_streak_match = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a TeamState from its teams.json record"""
+        state = cls()
+        state.winstreak = data["winstreak"]
+        state.losestreak = data["losestreak"]
+        state.games_without_win = data["games_without_win"]
+        state.games_without_loss = data["games_without_loss"]
+        state.match_history = new_history(data["match_history"])
+        state.last_streak_match = data["last_streak_match"]
+        return state
+
+    def to_dict(self):
+        """Return this team's record as stored; TeamRegistry.export_state() resolves opponent ids"""
+        return {
+            "winstreak": self.winstreak,
+            "losestreak": self.losestreak,
+            "games_without_win": self.games_without_win,
+            "games_without_loss": self.games_without_loss,
+            "match_history": list(self.match_history),
+            "last_streak_match": self.last_streak_match
+        }
+
+    def record_win(self, match_detail):
+        """Apply a win; it becomes the last streak match"""
+        self.winstreak += 1
+        self.losestreak = 0
+        self.games_without_win = 0
+        self.games_without_loss += 1
+        self.last_streak_match = match_detail
+        self._add_to_history(match_detail, self.games_without_loss)
+
+    def record_loss(self, match_detail):
+        """Apply a loss; the first loss after an unbeaten run starts a new history"""
+        if self.games_without_loss > 0:
+            self.last_streak_match = match_detail
+            self.match_history.clear()
+        self.losestreak += 1
+        self.winstreak = 0
+        self.games_without_win += 1
+        self.games_without_loss = 0
+        self._add_to_history(match_detail, self.games_without_win)
+
+    def record_draw(self, match_detail):
+        """Apply a draw"""
+        self.winstreak = 0
+        self.losestreak = 0
+        self.games_without_win += 1
+        self.games_without_loss += 1
+        self._add_to_history(match_detail, self.games_without_loss)
+
+    def _add_to_history(self, match_detail, keep):
+        """Append a match and keep only the last `keep` matches of the current streak"""
+        history = self.match_history
+        history.append(match_detail)
+        # Each entry is dropped at most once, so trimming is amortized O(1)
+        while len(history) > keep:
+            history.popleft()
+
+# Results for (home, away) indexed by the sign of the goal difference:
+# 0 = draw, 1 = home win, -1 = away win
+OUTCOMES = (('d', 'd'), ('w', 'l'), ('l', 'w'))
+RESULT_HANDLERS = {
+    'w': TeamState.record_win,
+    'l': TeamState.record_loss,
+    'd': TeamState.record_draw
+}
+OUTCOME_HANDLERS = tuple((RESULT_HANDLERS[home], RESULT_HANDLERS[away]) for home, away in OUTCOMES)
+
+def initialize_team():
+    """Return a new team structure with default values"""
+    return TeamState()
+
+def apply_match(teams, processed_matches, date, ht, at, hsc, asc, match_id=None):
+    """Apply one finished match to the team states; returns False for a duplicate
+
+    ht and at are team ids from a TeamRegistry, and teams is keyed by them.
+    Matches are deduplicated on match_id, normally the API event id. Without
+    one, the (home, away, home score, away score) tuple is used instead.
+    """
+    if match_id is None:
+        match_id = (ht, at, hsc, asc)
+    if match_id in processed_matches:
+        return False
+    processed_matches.add(match_id)
+
+    home = teams.get(ht)
+    if home is None:
+        home = teams[ht] = TeamState()
+    away = teams.get(at)
+    if away is None:
+        away = teams[at] = TeamState()
+
+    sign = (hsc > asc) - (hsc < asc)
+    ht_result, at_result = OUTCOMES[sign]
+    home_handler, away_handler = OUTCOME_HANDLERS[sign]
+
+    # Compact match records: [date, opponent id, result (w/l/d), score]
+    home_handler(home, [date, at, ht_result, f"{hsc}-{asc}"])
+    away_handler(away, [date, ht, at_result, f"{asc}-{hsc}"])
+    return True
+
+def legacy_apply_match(teams, processed_matches, date, ht, at, hsc, asc):
+    """The dict-based updater apply_match replaced, kept as the benchmark's baseline"""
+    match_id = (ht, at, hsc, asc)
+    if match_id in processed_matches:
+        return
+    processed_matches.add(match_id)
+
+    for team, opponent, scored, conceded in ((ht, at, hsc, asc), (at, ht, asc, hsc)):
+        if team not in teams:
+            teams[team] = {"winstreak": 0, "losestreak": 0, "games_without_win": 0, "games_without_loss": 0,
+                           "match_history": [], "last_streak_match": None}
+        stats = teams[team]
+        result = 'w' if scored > conceded else 'l' if scored < conceded else 'd'
+        match_detail = [date, opponent, result, f"{scored}-{conceded}"]
+
+        if result == 'w':
+            stats["winstreak"] += 1
+            stats["losestreak"] = 0
+            stats["games_without_win"] = 0
+            stats["games_without_loss"] += 1
+            stats["last_streak_match"] = match_detail
+        elif result == 'l':
+            if stats["games_without_loss"] > 0:
+                stats["last_streak_match"] = match_detail
+                stats["match_history"] = []
+            stats["losestreak"] += 1
+            stats["winstreak"] = 0
+            stats["games_without_win"] += 1
+            stats["games_without_loss"] = 0
+        else:
+            stats["winstreak"] = 0
+            stats["losestreak"] = 0
+            stats["games_without_win"] += 1
+            stats["games_without_loss"] += 1
+
+        # The whole history list is copied on every match
+        stats["match_history"].append(match_detail)
+        if stats["games_without_loss"] > 0:
+            stats["match_history"] = stats["match_history"][-stats["games_without_loss"]:]
+        elif stats["games_without_win"] > 0:
+            stats["match_history"] = stats["match_history"][-stats["games_without_win"]:]
+
+def time_replay(update, rows, repeat=5):
+    """Return (best seconds, teams) for replaying rows through an updater"""
+    best = None
+    for _ in range(repeat):
+        teams = {}
+        processed_matches = set()
+        start = time.perf_counter()
+        for date, ht, at, hsc, asc in rows:
+            update(teams, processed_matches, date, ht, at, hsc, asc)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, teams
+
+def main():
+    """Micro-benchmark: replay the saved match history through the legacy and current updaters"""
+    from load_from_files import load_match_archive
+    from team_registry import load_registry
+
+    archive = load_match_archive()
+    registry = load_registry()
+    rows = [(date, registry.intern(ht), registry.intern(at), hsc, asc)
+            for date in archive.get_dates() for ht, at, hsc, asc in archive.get_matches(date)]
+
+    legacy_best, _ = time_replay(legacy_apply_match, rows)
+    best, teams = time_replay(apply_match, rows)
+
+    print(f"Replayed {len(rows)} matches for {len(teams)} teams, best of 5")
+    print(f"Before (dict updater): {legacy_best * 1000:.1f} ms ({len(rows) / legacy_best:,.0f} matches/second)")
+    print(f"After (apply_match):   {best * 1000:.1f} ms ({len(rows) / best:,.0f} matches/second), "
+          f"{legacy_best / best:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import json
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from match_store import ARCHIVE_FILE, date_to_day, day_to_date
+from team_index import CATEGORIES
+
+HISTORY_FILE = "streak_history.bin"
+SNAPSHOT_INTERVAL = 7   # Days between full snapshots of every team's counters
+
+# File layout: header, then these arrays, then the team name table.
+#   log_days        uint16 x entries   (one entry per team per applied match, chronological)
+#   log_teams       uint32 x entries
+#   log_values      uint32 x entries*4 (the team's CATEGORIES counters after the match)
+#   team_offsets    uint32 x teams+1   (slice of team_positions for each team)
+#   team_positions  uint32 x entries   (log positions grouped by team, chronological within a team)
+#   snapshot_days   uint16 x snapshots (state before this day)
+#   snapshot_starts uint32 x snapshots (first log position on or after the day)
+#   snapshot_teams  uint32 x snapshots (teams known at the snapshot)
+#   snapshot_values uint32 x sum(snapshot_teams)*4
+#   names           UTF-8 JSON list, indexed by team id
+MAGIC = b"FSSH"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIIQQ")  # magic, version, reserved, entries, snapshots, teams, names size,
+                                       # archive size, archive mtime (ns)
+FIELDS = len(CATEGORIES)
+
+def get_archive_stamp(archive_path):
+    """Return (size, mtime_ns) identifying the archive version a history was built from"""
+    stat = os.stat(archive_path)
+    return stat.st_size, stat.st_mtime_ns
+
+class StreakHistory:
+    """Every team's streak counters over time: periodic snapshots plus a chronological change log"""
+
+    def __init__(self, path=HISTORY_FILE):
+        """Initialize an empty history bound to a file path"""
+        self.path = path
+        self.names = []
+        self.archive_stamp = (0, 0)
+        self.log_days = array('H')
+        self.log_teams = array('I')
+        self.log_values = array('I')
+        self.team_offsets = array('I', [0])
+        self.team_positions = array('I')
+        self.snapshot_days = array('H')
+        self.snapshot_starts = array('I')
+        self.snapshot_teams = array('I')
+        self.snapshot_values = array('I')
+        self._snapshot_offsets = [0]
+        self._ids = None
+
+    def _arrays(self):
+        """Return the arrays in file order"""
+        return (self.log_days, self.log_teams, self.log_values, self.team_offsets, self.team_positions,
+                self.snapshot_days, self.snapshot_starts, self.snapshot_teams, self.snapshot_values)
+
+    def build(self, archive, registry):
+        """Replay the archive's streak counters, recording every change and a snapshot every SNAPSHOT_INTERVAL days
+
+        Duplicate rows are skipped exactly as streak_engine.apply_match does.
+        """
+        team_ids = [registry.intern(name) for name in archive.names]
+        counters = {}
+        processed_matches = set()
+        next_snapshot = None
+        columns = zip(archive.days, archive.event_ids, archive.home_ids, archive.away_ids,
+                      archive.home_goals, archive.away_goals)
+
+        for day, event_id, home_id, away_id, hsc, asc in columns:
+            home_id, away_id = team_ids[home_id], team_ids[away_id]
+            match_id = event_id or (home_id, away_id, hsc, asc)
+            if match_id in processed_matches:
+                continue
+            processed_matches.add(match_id)
+
+            if next_snapshot is None or day >= next_snapshot:
+                self._add_snapshot(day, counters)
+                next_snapshot = day + SNAPSHOT_INTERVAL
+
+            sign = (hsc > asc) - (hsc < asc)
+            for team_id, result in ((home_id, sign), (away_id, -sign)):
+                ws, ls, gww, gwl = counters.get(team_id, (0, 0, 0, 0))
+                if result > 0:
+                    values = (ws + 1, 0, 0, gwl + 1)
+                elif result < 0:
+                    values = (0, ls + 1, gww + 1, 0)
+                else:
+                    values = (0, 0, gww + 1, gwl + 1)
+                counters[team_id] = values
+                self.log_days.append(day)
+                self.log_teams.append(team_id)
+                self.log_values.extend(values)
+
+        self.names = list(registry.names)
+        self._ids = None
+        self._index_teams()
+        if archive.exists():
+            self.archive_stamp = get_archive_stamp(archive.path)
+        return self
+
+    def _add_snapshot(self, day, counters):
+        """Record every known team's counters as the state before a day"""
+        team_count = max(counters, default=-1) + 1
+        values = array('I', bytes(team_count * FIELDS * 4))
+        for team_id, team_values in counters.items():
+            values[team_id * FIELDS:(team_id + 1) * FIELDS] = array('I', team_values)
+        self.snapshot_days.append(day)
+        self.snapshot_starts.append(len(self.log_days))
+        self.snapshot_teams.append(team_count)
+        self.snapshot_values.extend(values)
+        self._snapshot_offsets.append(len(self.snapshot_values))
+
+    def _index_teams(self):
+        """Group the log positions by team"""
+        counts = [0] * (len(self.names) + 1)
+        for team_id in self.log_teams:
+            counts[team_id + 1] += 1
+        for team_id in range(len(self.names)):
+            counts[team_id + 1] += counts[team_id]
+        self.team_offsets = array('I', counts)
+
+        next_slot = list(counts[:-1])
+        positions = array('I', bytes(len(self.log_teams) * 4))
+        for position, team_id in enumerate(self.log_teams):
+            positions[next_slot[team_id]] = position
+            next_slot[team_id] += 1
+        self.team_positions = positions
+
+    def save(self):
+        """Write the history to a temporary file and move it into place"""
+        names = json.dumps(self.names, ensure_ascii=False).encode('utf-8')
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(self.log_days), len(self.snapshot_days),
+                                len(self.names), len(names), *self.archive_stamp))
+            for values in self._arrays():
+                f.write(values.tobytes())
+            f.write(names)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Read the history file"""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        magic, version, _, entries, snapshots, teams, names_size, archive_size, archive_mtime = \
+            HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} streak history")
+
+        def read(fmt, count):
+            nonlocal offset
+            values = array(fmt)
+            values.frombytes(data[offset:offset + count * values.itemsize])
+            offset += count * values.itemsize
+            return values
+
+        offset = HEADER.size
+        self.log_days = read('H', entries)
+        self.log_teams = read('I', entries)
+        self.log_values = read('I', entries * FIELDS)
+        self.team_offsets = read('I', teams + 1)
+        self.team_positions = read('I', entries)
+        self.snapshot_days = read('H', snapshots)
+        self.snapshot_starts = read('I', snapshots)
+        self.snapshot_teams = read('I', snapshots)
+        self.snapshot_values = read('I', sum(self.snapshot_teams) * FIELDS)
+        self.names = json.loads(data[offset:offset + names_size].decode('utf-8'))
+        self.archive_stamp = (archive_size, archive_mtime)
+        self._ids = None
+
+        self._snapshot_offsets = [0]
+        for team_count in self.snapshot_teams:
+            self._snapshot_offsets.append(self._snapshot_offsets[-1] + team_count * FIELDS)
+        return self
+
+    def get_last_date(self):
+        """Return the last date with a recorded match, or None for an empty history"""
+        return day_to_date(self.log_days[-1]) if self.log_days else None
+
+    def get_states_before(self, date, names=None):
+        """Return {team: {category: value}} as it stood before date's matches
+
+        Only teams that had played by then are included. With names, each
+        team is looked up in the per-team index; otherwise the nearest
+        snapshot is loaded and the few days after it are replayed.
+        """
+        day = date_to_day(date)
+        if names is not None:
+            states = {}
+            if self._ids is None:
+                self._ids = {name: team_id for team_id, name in enumerate(self.names)}
+            for name in names:
+                team_id = self._ids.get(name)
+                values = None if team_id is None else self._team_values_before(team_id, day)
+                if values is not None:
+                    states[name] = dict(zip(CATEGORIES, values))
+            return states
+
+        snapshot = bisect_right(self.snapshot_days, day) - 1
+        counters = {}
+        position = 0
+        if snapshot >= 0:
+            start = self._snapshot_offsets[snapshot]
+            for team_id in range(self.snapshot_teams[snapshot]):
+                values = self.snapshot_values[start + team_id * FIELDS:start + (team_id + 1) * FIELDS]
+                # Every team that has played has a non-zero counter
+                if any(values):
+                    counters[team_id] = values
+            position = self.snapshot_starts[snapshot]
+
+        log_days, log_teams, log_values = self.log_days, self.log_teams, self.log_values
+        while position < len(log_days) and log_days[position] < day:
+            counters[log_teams[position]] = log_values[position * FIELDS:(position + 1) * FIELDS]
+            position += 1
+        return {self.names[team_id]: dict(zip(CATEGORIES, values)) for team_id, values in counters.items()}
+
+    def _team_values_before(self, team_id, day):
+        """Return a team's counters before a day, or None if it had not played yet"""
+        positions = self.team_positions[self.team_offsets[team_id]:self.team_offsets[team_id + 1]]
+        idx = bisect_left(positions, day, key=lambda position: self.log_days[position])
+        if idx == 0:
+            return None
+        position = positions[idx - 1]
+        return self.log_values[position * FIELDS:(position + 1) * FIELDS]
+
+def build_streak_history(archive, registry, path=HISTORY_FILE):
+    """Build the streak history for an archive and save it"""
+    history = StreakHistory(path).build(archive, registry)
+    history.save()
+    return history
+
+def load_streak_history(path=HISTORY_FILE, archive_path=ARCHIVE_FILE):
+    """Load the streak history, rebuilding it if the match archive has changed since; None without an archive"""
+    if not os.path.exists(archive_path):
+        return None
+    if os.path.exists(path):
+        history = StreakHistory(path).load()
+        if history.archive_stamp == get_archive_stamp(archive_path):
+            return history
+
+    from load_from_files import load_match_archive
+    from team_registry import load_registry
+    print("Rebuilding streak history from the match archive...")
+    return build_streak_history(load_match_archive(), load_registry(), path)
+
+def main():
+    """Build the streak history and time an as-of query for every archive date"""
+    history = load_streak_history()
+    if history is None:
+        print("No match archive found")
+        return
+    dates = sorted({day_to_date(day) for day in history.log_days})
+    print(f"{len(history.log_days)} changes, {len(history.snapshot_days)} snapshots, {len(history.names)} teams")
+
+    start = time.perf_counter()
+    for date in dates:
+        history.get_states_before(date)
+    elapsed = time.perf_counter() - start
+    print(f"All-team state for {len(dates)} dates: {elapsed * 1000:.1f} ms "
+          f"({elapsed / max(1, len(dates)) * 1000:.2f} ms per date)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import json
+import os
+import sqlite3
+
+INDEX_FILE = "teams_index.db"
+CATEGORIES = ("winstreak", "losestreak", "games_without_win", "games_without_loss")
+
+def get_index_rows(teams, team_ids, registry):
+    """Return (name, counters..., record JSON) rows for the given team ids"""
+    rows = []
+    for team_id in team_ids:
+        record = registry.export_state(teams[team_id])
+        rows.append((registry.names[team_id], *(record[cat] for cat in CATEGORIES),
+                     json.dumps(record, ensure_ascii=False)))
+    return rows
+
+def build_index(teams, registry, path=INDEX_FILE):
+    """Write an SQLite index of team statistics with one sorted leaderboard per category"""
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(
+            "CREATE TABLE teams (name TEXT PRIMARY KEY, winstreak INTEGER, losestreak INTEGER, "
+            "games_without_win INTEGER, games_without_loss INTEGER, record TEXT) WITHOUT ROWID"
+        )
+        conn.executemany("INSERT INTO teams VALUES (?, ?, ?, ?, ?, ?)", get_index_rows(teams, teams, registry))
+
+        # Leaderboards are served straight from these indexes
+        for cat in CATEGORIES:
+            conn.execute(f"CREATE INDEX idx_{cat} ON teams ({cat} DESC, name)")
+        conn.commit()
+    finally:
+        conn.close()
+
+    # Readers only ever see a complete index
+    os.replace(tmp_path, path)
+
+def update_index(teams, team_ids, registry, path=INDEX_FILE):
+    """Upsert the given teams; the category indexes re-rank them without a full re-sort"""
+    if not os.path.exists(path):
+        build_index(teams, registry, path)
+        return
+
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO teams VALUES (?, ?, ?, ?, ?, ?)",
+                             get_index_rows(teams, team_ids, registry))
+    finally:
+        conn.close()
+
+class TeamIndex:
+    """Read-only queries against the team statistics index"""
+
+    def __init__(self, path=INDEX_FILE):
+        """Open the index file read-only"""
+        self.path = path
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+    def get_team(self, name):
+        """Return a team's teams.json record, or None if it is not indexed"""
+        row = self.conn.execute("SELECT record FROM teams WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def top_teams(self, category, names=None, limit=3):
+        """Return the top (name, value) pairs for a category, optionally among the given teams only"""
+        if category not in CATEGORIES:
+            raise ValueError(f"Unknown category: {category}")
+
+        if names is None:
+            return self.conn.execute(
+                f"SELECT name, {category} FROM teams ORDER BY {category} DESC, name LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (name TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM wanted")
+        self.conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((name,) for name in names))
+        return self.conn.execute(
+            f"SELECT teams.name, teams.{category} FROM teams JOIN wanted ON teams.name = wanted.name "
+            f"ORDER BY teams.{category} DESC, teams.name LIMIT ?",
+            (limit,)
+        ).fetchall()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
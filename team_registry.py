@@ -0,0 +1,116 @@
+import json
+from collections import deque
+
+from streak_engine import TeamState, new_history
+
+ALIASES_FILE = "team_aliases.json"
+
+class TeamRegistry:
+    """Map team names to dense integer ids, folding renamed teams into one id
+
+    Team states, match histories and duplicate keys hold these ids; names are
+    only looked up again when state is written out. Aliases map an old or
+    alternative API name to the canonical name used in output.
+    """
+
+    def __init__(self, aliases=None):
+        """Initialize an empty registry with an optional {alias: canonical name} mapping"""
+        self.names = []
+        self._ids = {}
+        self._strings = {}
+        self.aliases = dict(aliases or {})
+
+    def canonical_name(self, name):
+        """Follow aliases to the name a team is stored under"""
+        seen = set()
+        while name in self.aliases and name not in seen:
+            seen.add(name)
+            name = self.aliases[name]
+        return name
+
+    def intern(self, name):
+        """Return the id for a team name or alias, assigning a new id if needed"""
+        team_id = self._ids.get(name)
+        if team_id is None:
+            canonical = self.canonical_name(name)
+            team_id = self._ids.get(canonical)
+            if team_id is None:
+                team_id = len(self.names)
+                self.names.append(canonical)
+                self._ids[canonical] = team_id
+            # Remember the alias itself so later lookups are a single dict hit
+            self._ids[name] = team_id
+        return team_id
+
+    def lookup(self, name):
+        """Return the id for a team name or alias, or None if it has never been seen"""
+        team_id = self._ids.get(name)
+        if team_id is None:
+            team_id = self._ids.get(self.canonical_name(name))
+        return team_id
+
+    def _share(self, value):
+        """Return one shared copy of a repeated string (dates, results and scores)"""
+        return self._strings.setdefault(value, value)
+
+    def _import_detail(self, detail):
+        """Convert a [date, opponent name, result, score] record to use the opponent's id"""
+        share = self._share
+        return [share(detail[0]), self.intern(detail[1]), share(detail[2]), share(detail[3])]
+
+    def _export_detail(self, detail):
+        """Convert a [date, opponent id, result, score] record back to the opponent's name"""
+        return [detail[0], self.names[detail[1]], detail[2], detail[3]]
+
+    def load_states(self, records):
+        """Convert teams.json records keyed by name into TeamState objects keyed by id"""
+        teams = {}
+        for name, record in records.items():
+            team_id = self.intern(name)
+            if team_id in teams and name != self.names[team_id]:
+                # Keep the record stored under the canonical name over an alias's
+                continue
+            state = TeamState.from_dict(record)
+            state.match_history = new_history(self._import_detail(d) for d in state.match_history)
+            if state.last_streak_match is not None:
+                state.last_streak_match = self._import_detail(state.last_streak_match)
+            teams[team_id] = state
+        return teams
+
+    def export_state(self, state):
+        """Return the teams.json record for a TeamState, with team names resolved"""
+        record = state.to_dict()
+        record["match_history"] = [self._export_detail(d) for d in record["match_history"]]
+        if record["last_streak_match"] is not None:
+            record["last_streak_match"] = self._export_detail(record["last_streak_match"])
+        return record
+
+    def named(self, teams, team_ids=None):
+        """Return {name: state} for the given team ids (all teams when None), in order"""
+        names = self.names
+        if team_ids is None:
+            return {names[team_id]: state for team_id, state in teams.items()}
+        return {names[team_id]: teams[team_id] for team_id in team_ids}
+
+    def state_to_json(self, value):
+        """json.dump default hook that writes team states and histories in teams.json form"""
+        if isinstance(value, TeamState):
+            return self.export_state(value)
+        if isinstance(value, deque):
+            return list(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def load_aliases(path=ALIASES_FILE):
+    """Load the {alias: canonical name} mapping, or an empty one if there is no file"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        print(f"Error loading {path}: {e}")
+        return {}
+
+def load_registry(path=ALIASES_FILE):
+    """Return an empty registry configured with the aliases file"""
+    return TeamRegistry(load_aliases(path))
@@ -0,0 +1,175 @@
+import json
+import os
+
+from atomic_file import write_json_atomic
+
+TEAMS_FILE = "teams.json"
+COMPACT_EVERY = 20   # Journal entries between full rewrites of teams.json
+
+class TeamStore:
+    """Persist team statistics as teams.json plus an append-only journal of changed teams
+
+    Every compaction also writes "<path>.idx", the byte offset and length of
+    each team's record in teams.json, so one team can be read without
+    parsing the whole file.
+    """
+
+    def __init__(self, path=TEAMS_FILE, compact_every=COMPACT_EVERY):
+        """Initialize the store for a teams file and its journal"""
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.index_path = f"{path}.idx"
+        self.compact_every = compact_every
+        self.journal_entries = 0
+        self.committed_dates = set()
+
+    def load(self):
+        """Load teams.json and replay any journal entries written since the last compaction"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                teams = json.load(f)
+        except FileNotFoundError:
+            teams = {}
+
+        self.journal_entries = 0
+        self.committed_dates = set()
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn final line from an interrupted write is ignored
+                        break
+                    teams.update(entry["teams"])
+                    if not entry.get("partial"):
+                        self.committed_dates.add(entry["date"])
+                    self.journal_entries += 1
+        except FileNotFoundError:
+            pass
+
+        return teams
+
+    def count_journal_entries(self):
+        """Count the journal entries on disk without loading teams.json, so compact_if_needed() can be used"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                self.journal_entries = sum(1 for _ in f)
+        except FileNotFoundError:
+            self.journal_entries = 0
+
+    def commit(self, date, teams, changed_teams, registry, partial=False):
+        """Atomically record the changed teams (ids in the registry) for a processed date
+
+        A partial commit (a date still in progress) does not mark the date as processed.
+        """
+        entry = {"date": date, "teams": registry.named(teams, changed_teams)}
+        if partial:
+            entry["partial"] = True
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=registry.state_to_json) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.journal_entries += 1
+        if not partial:
+            self.committed_dates.add(date)
+
+    def compact_if_needed(self, teams, registry):
+        """Compact once the journal has grown past the configured number of entries"""
+        if self.journal_entries >= self.compact_every:
+            self.compact(teams, registry)
+
+    def compact(self, teams, registry):
+        """Rewrite teams.json in full, update its offset index and clear the journal"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            offsets = write_teams(f, registry.named(teams), registry.state_to_json)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._write_index(offsets)
+
+        # Replaying a stale journal over the new file is harmless, so a crash
+        # before this point cannot lose or corrupt state
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_entries = 0
+
+    def _write_index(self, offsets):
+        """Write the record offsets for the current teams.json, stamped with its size and mtime"""
+        stat = os.stat(self.path)
+        write_json_atomic(self.index_path, {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "teams": offsets})
+
+    def _load_index(self):
+        """Return {name: [offset, length]} if the index matches teams.json, else None"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            stat = os.stat(self.path)
+        except (FileNotFoundError, ValueError):
+            return None
+        if (index["size"], index["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return index["teams"]
+
+    def get_team(self, name):
+        """Return one team's current record, or None, decoding only that record
+
+        The journal is checked first since it holds the newest changes; then
+        the record is read at its indexed offset in teams.json. Without a
+        valid index the whole file is loaded instead.
+        """
+        record = None
+        marker = json.dumps(name, ensure_ascii=False)
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    # Only decode entries that can mention the team
+                    if marker not in line:
+                        continue
+                    try:
+                        record = json.loads(line)["teams"].get(name, record)
+                    except ValueError:
+                        break
+        except FileNotFoundError:
+            pass
+        if record is not None:
+            return record
+
+        offsets = self._load_index()
+        if offsets is None:
+            return self.load().get(name)
+        if name not in offsets:
+            return None
+        offset, length = offsets[name]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length).decode('utf-8'))
+
+def write_teams(f, named_teams, default):
+    """Write {name: state} to a binary file exactly as json.dump(indent=4) would; returns {name: [offset, length]}"""
+    if not named_teams:
+        f.write(b"{}")
+        return {}
+
+    offsets = {}
+    separator = "{\n    "
+    for name, state in named_teams.items():
+        f.write(f"{separator}{json.dumps(name, ensure_ascii=False)}: ".encode('utf-8'))
+        # Nested values are indented one level deeper than at the top level
+        record = json.dumps(state, indent=4, ensure_ascii=False, default=default).replace("\n", "\n    ")
+        data = record.encode('utf-8')
+        offsets[name] = [f.tell(), len(data)]
+        f.write(data)
+        separator = ",\n    "
+    f.write(b"\n}")
+    return offsets
+
+def load_teams(path=TEAMS_FILE):
+    """Load the current team statistics, including journaled changes"""
+    return TeamStore(path).load()
+
+def load_team(name, path=TEAMS_FILE):
+    """Load one team's current statistics without parsing all of teams.json"""
+    return TeamStore(path).get_team(name)
@@ -0,0 +1,42 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from event_index import EventIndex, merge_sorted_ids
+
+class MergeSortedIdsTest(unittest.TestCase):
+
+    def test_matches_a_full_sort(self):
+        rnd = random.Random(1)
+        ids = array('Q', sorted(rnd.sample(range(10 ** 9), 5000)))
+        new_ids = sorted(set(rnd.sample(range(10 ** 9), 50)) - set(ids))
+        self.assertEqual(merge_sorted_ids(ids, new_ids), array('Q', sorted(ids.tolist() + new_ids)))
+
+    def test_new_ids_before_and_after_every_existing_one(self):
+        self.assertEqual(merge_sorted_ids(array('Q', [5, 6]), [1, 9]), array('Q', [1, 5, 6, 9]))
+        self.assertEqual(merge_sorted_ids(array('Q'), [2, 3]), array('Q', [2, 3]))
+
+class EventIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "processed_events.bin")
+
+    def test_ids_added_across_saves_are_kept_sorted(self):
+        index = EventIndex(self.path)
+        for batch in ([30, 10, 20], [25, 5], [40]):
+            for event_id in batch:
+                index.add(event_id)
+            index.save()
+
+        loaded = EventIndex(self.path).load()
+        self.assertEqual(loaded.ids, array('Q', [5, 10, 20, 25, 30, 40]))
+        self.assertIn(25, loaded)
+        self.assertNotIn(26, loaded)
+
+if __name__ == "__main__":
+    unittest.main()
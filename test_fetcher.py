@@ -0,0 +1,169 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer
+
+from benchmark import STUB_PATH, StubHandler, make_event
+from fetcher import RECENT_TTL, UNFINISHED_TTL, DateFetcher, NotCachedError, RateLimiter, get_events_ttl
+from instrumentation import RunMetrics
+
+DATES = [f"2025-03-{day:02d}" for day in range(1, 9)]
+
+class RecordingStubHandler(StubHandler):
+    """StubHandler that records when each request arrives and can delay or fail chosen dates"""
+    delays = {}
+    failures = set()
+    arrivals = None
+    completed = None
+
+    def do_GET(self):
+        date = self.path.rsplit('/', 1)[-1]
+        self.arrivals.append((time.monotonic(), date))
+        time.sleep(self.delays.get(date, 0))
+        if date in self.failures:
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            super().do_GET()
+        self.completed.append(date)
+
+class StubServerTestCase(unittest.TestCase):
+    """Serve a few dates of events from a temporary directory"""
+
+    def setUp(self):
+        self.events_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.events_dir)
+        for idx, date in enumerate(DATES):
+            events = [make_event(idx * 10 + i, date, (f"Home {i}", f"Away {i}", i, 1)) for i in range(3)]
+            with open(os.path.join(self.events_dir, f"{date}.json"), 'w', encoding='utf-8') as f:
+                json.dump({"events": events}, f)
+
+    def start_server(self, delays=None, failures=()):
+        """Start the recording stub; return the base URL"""
+        self.handler = type("TestStubHandler", (RecordingStubHandler,), {
+            "events_dir": self.events_dir, "delays": delays or {}, "failures": set(failures),
+            "arrivals": [], "completed": []})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_port}{STUB_PATH}{{date}}"
+
+    def make_fetcher(self, base_url, **kwargs):
+        fetcher = DateFetcher(base_url, **kwargs)
+        self.addCleanup(fetcher.close)
+        return fetcher
+
+class FetchInOrderTest(StubServerTestCase):
+
+    def test_results_follow_request_order_when_responses_finish_out_of_order(self):
+        # Earlier dates answer more slowly, so later ones complete first
+        delays = {date: 0.05 * (len(DATES) - idx) for idx, date in enumerate(DATES)}
+        fetcher = self.make_fetcher(self.start_server(delays), max_workers=4, requests_per_second=0)
+
+        results = list(fetcher.fetch_in_order(DATES))
+
+        self.assertEqual([date for date, _ in results], DATES)
+        self.assertNotEqual(self.handler.completed, DATES)
+        for idx, (date, fixtures) in enumerate(results):
+            self.assertEqual([fixture.event_id for fixture in fixtures], [idx * 10 + i for i in range(3)])
+            self.assertEqual(fixtures[2][1:5], ("Home 2", "Away 2", 2, 1))
+
+    def test_window_bounds_requests_in_flight(self):
+        fetcher = self.make_fetcher(self.start_server(), max_workers=2, requests_per_second=0)
+        results = fetcher.fetch_in_order(DATES)
+
+        next(results)
+        time.sleep(0.2)
+        # Only the first window of max_workers * 2 dates is requested until more are consumed
+        self.assertLessEqual(len(self.handler.arrivals), 4)
+        self.assertEqual([date for date, _ in results], DATES[1:])
+
+class RateLimitTest(StubServerTestCase):
+
+    def test_requests_to_one_host_are_spaced(self):
+        fetcher = self.make_fetcher(self.start_server(), max_workers=4, requests_per_second=20)
+
+        list(fetcher.fetch_in_order(DATES))
+
+        times = sorted(arrival for arrival, _ in self.handler.arrivals)
+        self.assertEqual(len(times), len(DATES))
+        # Slots are 0.05s apart; a request can reach the server a little after its slot
+        # (opening a pooled connection), so single gaps only get half an interval
+        self.assertGreaterEqual(times[-1] - times[0], 0.05 * (len(DATES) - 1) - 0.01)
+        for earlier, later in zip(times, times[1:]):
+            self.assertGreaterEqual(later - earlier, 0.025)
+
+    def test_hosts_are_limited_separately(self):
+        limiter = RateLimiter(2)
+        start = time.monotonic()
+        limiter.wait("http://a.example/1")
+        limiter.wait("http://b.example/1")
+        self.assertLess(time.monotonic() - start, 0.25)
+        limiter.wait("http://a.example/2")
+        self.assertGreaterEqual(time.monotonic() - start, 0.45)
+
+class FetchErrorTest(StubServerTestCase):
+
+    def test_failed_date_is_reported_and_others_are_returned(self):
+        failed = DATES[2]
+        metrics = RunMetrics("test")
+        fetcher = self.make_fetcher(self.start_server(failures={failed}), max_workers=4, requests_per_second=0,
+                                    metrics=metrics)
+
+        results = dict(fetcher.fetch_in_order(DATES, fetcher.try_fixtures))
+
+        fixtures, error = results[failed]
+        self.assertEqual(fixtures, [])
+        self.assertIn("500", str(error))
+        self.assertTrue(all(error is None and len(fixtures) == 3
+                            for date, (fixtures, error) in results.items() if date != failed))
+        self.assertEqual(metrics.counters["fetch_errors"], 1)
+
+    def test_get_fixtures_returns_an_empty_list_on_error(self):
+        fetcher = self.make_fetcher(self.start_server(failures={DATES[0]}), requests_per_second=0)
+
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(fetcher.get_fixtures(DATES[0]), [])
+        self.assertIn(f"Error fetching {DATES[0]}", output.getvalue())
+
+    def test_malformed_body_is_an_error(self):
+        with open(os.path.join(self.events_dir, f"{DATES[0]}.json"), 'w', encoding='utf-8') as f:
+            f.write('{"events": [{"id": 1,')
+        fetcher = self.make_fetcher(self.start_server(), requests_per_second=0)
+
+        fixtures, error = fetcher.try_fixtures(DATES[0])
+        self.assertEqual(fixtures, [])
+        self.assertIsInstance(error, ValueError)
+
+    def test_offline_miss_is_not_cached_error(self):
+        fetcher = self.make_fetcher(self.start_server(), offline=True)
+
+        _, error = fetcher.try_fixtures(DATES[0])
+        self.assertIsInstance(error, NotCachedError)
+        self.assertEqual(self.handler.arrivals, [])
+
+class EventsTtlTest(unittest.TestCase):
+
+    def test_past_date_with_only_settled_events_is_permanent(self):
+        # Postponed, canceled and finished events all count as settled
+        self.assertIsNone(get_events_ttl("2025-03-01", 3, any_live=False))
+
+    def test_past_date_with_live_events_expires(self):
+        self.assertEqual(get_events_ttl("2025-03-01", 3, any_live=True), UNFINISHED_TTL)
+
+    def test_empty_past_date_expires(self):
+        self.assertEqual(get_events_ttl("2025-03-01", 0, any_live=False), UNFINISHED_TTL)
+
+    def test_future_date_expires_soon(self):
+        self.assertEqual(get_events_ttl("2999-01-01", 3, any_live=False), RECENT_TTL)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from league_store import LeagueStore, load_league_store
+from streak_engine import apply_match
+from team_registry import TeamRegistry
+
+LEAGUE = ("England", "Premier League")
+
+class LeagueStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        # Not created up front, as on a fresh checkout where leagues/ is ignored
+        self.directory = os.path.join(self.root, "leagues")
+        self.registry = TeamRegistry()
+        self.teams = {}
+
+    def play(self, store, date, home, away, home_goals, away_goals):
+        """Apply a match to the team states and record it in the store; return the team ids"""
+        home_id, away_id = self.registry.intern(home), self.registry.intern(away)
+        apply_match(self.teams, set(), date, home_id, away_id, home_goals, away_goals)
+        store.add_match(date, home, away, LEAGUE)
+        return {home_id, away_id}
+
+    def test_update_creates_missing_directory(self):
+        store = LeagueStore(self.directory)
+        changed = self.play(store, "2025-03-01", "Arsenal", "Chelsea", 2, 0)
+
+        store.update(self.teams, self.registry, changed)
+
+        loaded = load_league_store(self.directory)
+        self.assertEqual(loaded.find_leagues("premier league"), ["england-premier-league"])
+        shard = loaded.open_shard("england-premier-league")
+        self.assertIsNotNone(shard)
+        self.assertEqual(shard.get_team("Arsenal")["winstreak"], 1)
+        self.assertEqual(shard.get_team("Chelsea")["losestreak"], 1)
+
+    def test_manifest_is_rewritten_only_when_membership_changes(self):
+        store = LeagueStore(self.directory)
+        store.update(self.teams, self.registry, self.play(store, "2025-03-01", "Arsenal", "Chelsea", 1, 1))
+        stamp = os.stat(store.path).st_mtime_ns
+
+        # Another flush of the same matchday adds no member and no later date
+        store.update(self.teams, self.registry, self.play(store, "2025-03-01", "Arsenal", "Chelsea", 1, 1))
+        self.assertFalse(store.changed)
+        self.assertEqual(os.stat(store.path).st_mtime_ns, stamp)
+
+        store.update(self.teams, self.registry, self.play(store, "2025-03-08", "Chelsea", "Everton", 3, 1))
+        self.assertEqual(sorted(load_league_store(self.directory).get_members("england-premier-league")),
+                         ["Arsenal", "Chelsea", "Everton"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from live_stub import make_events, start_replay_server
+
+DATE = "2025-05-03"
+MATCHES = 12
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class LiveReplayTest(unittest.TestCase):
+    """Run the live poller against a replayed matchday in an empty working tree"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        # As on a fresh checkout: match_stats/ is tracked, everything else is created by the run
+        os.makedirs(os.path.join(self.work_dir, "match_stats"))
+        self.events = make_events(DATE, MATCHES, seed=3)
+        server, self.base_url = start_replay_server(self.events, DATE, duration=3, seed=3)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+    def run_live(self):
+        """Run live.run() until every match is over in a separate process; return its output"""
+        code = (f"import live; live.run({self.base_url!r}, {DATE!r}, poll_interval=0.1, "
+                f"flush_interval=0.5, until_finished=True)")
+        env = dict(os.environ, PYTHONPATH=REPO_DIR)
+        result = subprocess.run([sys.executable, "-c", code], cwd=self.work_dir, env=env,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+
+    def test_each_finished_match_is_applied_once(self):
+        output = self.run_live()
+
+        self.assertNotIn("Error", output)
+        finished = re.findall(rf"^{DATE} finished: (.+) \d+-\d+ (.+)$", output, re.MULTILINE)
+        expected = [(event["homeTeam"]["name"], event["awayTeam"]["name"]) for event in self.events]
+        self.assertCountEqual(finished, expected)
+
+        sys.path.insert(0, REPO_DIR)
+        from match_store import MatchArchive
+        archive = MatchArchive(os.path.join(self.work_dir, "match_stats", "matches.bin")).load()
+        self.addCleanup(archive.close)
+        self.assertCountEqual(archive.get_event_ids(DATE), [event["id"] for event in self.events])
+        self.assertEqual(len({match[:2] for match in archive.get_matches(DATE)}), MATCHES)
+
+        # Live flushes never mark the date as processed, so a later scrape still fetches it
+        with open(os.path.join(self.work_dir, "teams.json.journal"), 'r', encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f]
+        self.assertTrue(entries)
+        self.assertTrue(all(entry["partial"] for entry in entries))
+        self.assertEqual({entry["date"] for entry in entries}, {DATE})
+        journaled = set().union(*(entry["teams"] for entry in entries))
+        self.assertEqual(journaled, {team for pair in expected for team in pair})
+
+        self.assertTrue(os.path.exists(os.path.join(self.work_dir, "leagues", "leagues.json")))
+
+if __name__ == "__main__":
+    unittest.main()
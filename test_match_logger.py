@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from match_logger import MatchLogger
+
+class MatchLoggerIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.log_file = os.path.join(self.directory, "skipped_matches.jsonl")
+
+    def make_logger(self):
+        logger = MatchLogger(self.log_file, buffer_size=2, json_lines=True)
+        self.addCleanup(logger.close)
+        return logger
+
+    def log_matches(self, logger):
+        logger.log_skipped_match("2025-03-01", "Arsenal", "Chelsea", event_id=1)
+        logger.log_skipped_match("2025-03-01", "Everton", "Fulham", event_id=2)
+        logger.log_skipped_match("2025-03-02", "Chelsea", "Everton", event_id=3)
+        logger.log_skipped_match("2025-03-03", "Arsenal", "Fulham", event_id=4)
+
+    def event_ids(self, logger, **query):
+        return [entry["event_id"] for entry in logger.find_skipped(**query)]
+
+    def test_batches_append_deltas_until_close(self):
+        logger = self.make_logger()
+        self.log_matches(logger)
+
+        # Two full batches were written without touching the compacted index
+        self.assertFalse(os.path.exists(logger.index_path))
+        self.assertTrue(os.path.exists(logger.index_log_path))
+        self.assertEqual(self.event_ids(logger, team="Chelsea"), [1, 3])
+
+        # A second logger sees the uncompacted batches too
+        self.assertEqual(self.event_ids(self.make_logger(), date="2025-03-01"), [1, 2])
+
+        logger.close()
+        self.assertTrue(os.path.exists(logger.index_path))
+        self.assertFalse(os.path.exists(logger.index_log_path))
+        reopened = self.make_logger()
+        self.assertEqual(self.event_ids(reopened, team="Arsenal"), [1, 4])
+        self.assertEqual(self.event_ids(reopened), [1, 2, 3, 4])
+
+    def test_deltas_left_by_an_interrupted_compaction_are_not_applied_twice(self):
+        logger = self.make_logger()
+        self.log_matches(logger)
+        with open(logger.index_log_path, 'r', encoding='utf-8') as f:
+            deltas = f.read()
+        logger.close()
+        # As if close() stopped after writing the index but before removing the deltas
+        with open(logger.index_log_path, 'w', encoding='utf-8') as f:
+            f.write(deltas)
+
+        reopened = self.make_logger()
+        reopened.log_skipped_match("2025-03-04", "Chelsea", "Arsenal", event_id=5)
+        self.assertEqual(reopened._index["teams"]["Arsenal"], sorted(set(reopened._index["teams"]["Arsenal"])))
+        self.assertEqual(self.event_ids(reopened, team="Arsenal"), [1, 4, 5])
+
+if __name__ == "__main__":
+    unittest.main()